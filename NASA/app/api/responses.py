@@ -0,0 +1,10 @@
+from __future__ import annotations
+
+try:
+    import orjson  # noqa: F401
+except ImportError:  # orjson is optional; fall back to the stdlib encoder
+    from fastapi.responses import JSONResponse as FastJSONResponse
+else:
+    from fastapi.responses import ORJSONResponse as FastJSONResponse
+
+__all__ = ["FastJSONResponse"]
@@ -1,16 +1,25 @@
-from datetime import date
-from typing import Optional, List, Dict
+import json
+import re
+from datetime import date, datetime
+from functools import lru_cache
+from math import isfinite
+from typing import Optional, List, Dict, Literal, Tuple
 
-from fastapi import APIRouter, Query, HTTPException
+from fastapi import APIRouter, Query, HTTPException, Response
 from pydantic import BaseModel
 
-from app.services.power_client import fetch_daily_series
+from app.api.responses import FastJSONResponse
+from app.services.power_cache import fetch_series_arrays_cached
 from app.services.chatbot_service_v3 import WeatherChatbotV3
 from app.utils.stats import (
-    compute_exceedance_probability,
+    compute_doy_climatology,
+    count_exceedances,
+    mann_kendall_z,
+    sens_slope,
     wilson_confidence_interval,
-    select_dayofyear_window,
+    select_doy_window,
 )
+from app.utils.series import SeriesArrays, as_stored
 
 
 router = APIRouter()
@@ -29,29 +38,44 @@ class ChatbotRequest(BaseModel):
         """Parse and validate target date"""
         if not self.target_date:
             return date.today()
-        
+        # If all parsing fails, return today's date
+        return _parse_target_date(self.target_date) or date.today()
+
+
+_ISO_LIKE_DATE = re.compile(r"^(\d{4})([-/])(\d{2})\2(\d{2})$")
+_DATE_FORMATS = (
+    '%Y-%m-%d',      # 2025-10-04
+    '%d/%m/%Y',      # 04/10/2025
+    '%m/%d/%Y',      # 10/04/2025
+    '%d-%m-%Y',      # 04-10-2025
+    '%Y/%m/%d',      # 2025/10/04
+)
+
+
+@lru_cache(maxsize=4096)
+def _parse_target_date(value: str) -> Optional[date]:
+    """Parse a user supplied date string, or None if no known format matches.
+
+    Failures return None instead of today's date so the cache never pins a stale "today".
+    """
+    match = _ISO_LIKE_DATE.match(value)
+    if match:
         try:
-            # Try different date formats
-            date_formats = [
-                '%Y-%m-%d',      # 2025-10-04
-                '%d/%m/%Y',      # 04/10/2025
-                '%m/%d/%Y',      # 10/04/2025
-                '%d-%m-%Y',      # 04-10-2025
-                '%Y/%m/%d',      # 2025/10/04
-            ]
-            
-            for fmt in date_formats:
-                try:
-                    return datetime.strptime(self.target_date, fmt).date()
-                except ValueError:
-                    continue
-            
-            # If no format works, try to parse as ISO format
-            return datetime.fromisoformat(self.target_date).date()
-            
-        except Exception:
-            # If all parsing fails, return today's date
-            return date.today()
+            return date(int(match.group(1)), int(match.group(3)), int(match.group(4)))
+        except ValueError:
+            pass
+
+    for fmt in _DATE_FORMATS:
+        try:
+            return datetime.strptime(value, fmt).date()
+        except ValueError:
+            continue
+
+    # If no format works, try to parse as ISO format
+    try:
+        return datetime.fromisoformat(value).date()
+    except ValueError:
+        return None
 
 
 class ChatbotResponse(BaseModel):
@@ -66,6 +90,111 @@ def health() -> dict:
     return {"status": "ok"}
 
 
+SERIES_START = date(1981, 1, 1)
+# Validated as a plain membership test rather than a regex match
+Comparison = Literal["gt", "lt"]
+
+
+def _fetch_vars(lat: float, lon: float, variables: List[str]) -> Tuple[Dict[str, SeriesArrays], date, date]:
+    """Fetch (or reuse) the full daily series for several variables in one POWER request"""
+    start = SERIES_START
+    end = date.today()
+    series = fetch_series_arrays_cached(lat=lat, lon=lon, start=start, end=end, parameters=variables)
+    return series, start, end
+
+
+def _fetch_var(lat: float, lon: float, var: str) -> Tuple[SeriesArrays, date, date]:
+    """Fetch (or reuse) the full daily series for one variable"""
+    series, start, end = _fetch_vars(lat, lon, [var])
+    return series[var], start, end
+
+
+def _compute_probability(
+    series_var: SeriesArrays,
+    target_date: date,
+    threshold: float,
+    comparison: Comparison,
+    window_days: int,
+    start: date,
+    end: date,
+) -> dict:
+    samples = select_doy_window(series_var, target_date, window_days)
+    k, n = count_exceedances(samples, as_stored(threshold), comparison)
+    ci_low, ci_high = wilson_confidence_interval(k, n)
+    return {
+        "probability": k / n if n else float("nan"),
+        "n_samples": n,
+        "ci_95": [ci_low, ci_high],
+        "threshold": threshold,
+        "comparison": comparison,
+        "units": None,
+        "source": ["NASA POWER (MERRA-2 derived)"],
+        "period": f"{start.year}–{end.year}",
+        "method": f"DOY ±{window_days}d; binomial proportion (Wilson CI)",
+    }
+
+
+def _compute_climatology(series_var: SeriesArrays, start: date, end: date) -> dict:
+    days, means, medians, p10s, p90s = compute_doy_climatology(series_var)
+    return {
+        "doy": days,
+        "mean": [round(x, 3) if isfinite(x) else None for x in means],
+        "median": [round(x, 3) if isfinite(x) else None for x in medians],
+        "p10": [round(x, 3) if isfinite(x) else None for x in p10s],
+        "p90": [round(x, 3) if isfinite(x) else None for x in p90s],
+        "units": None,
+        "source": ["NASA POWER"],
+        "period": f"{start.year}–{end.year}",
+    }
+
+
+def _compute_trend(
+    series_var: SeriesArrays,
+    target_date: date,
+    threshold: float,
+    comparison: Comparison,
+    window_days: int,
+    start: date,
+    end: date,
+) -> dict:
+    center = target_date.timetuple().tm_yday
+    lower = max(1, center - window_days)
+    upper = min(366, center + window_days)
+    limit = as_stored(threshold)
+    years = []
+    values = []
+    if len(series_var):
+        # Per-year counters indexed by (year - first_year); no hashing or key sort
+        first_year = min(series_var.years)
+        totals = [0] * (max(series_var.years) - first_year + 1)
+        exceed = [0] * len(totals)
+        gt = comparison == "gt"
+        lt = comparison == "lt"
+        for year, doy, v in zip(series_var.years, series_var.doy, series_var.values):
+            if not (lower <= doy <= upper and isfinite(v)):
+                continue
+            i = year - first_year
+            totals[i] += 1
+            if (gt and v > limit) or (lt and v < limit):
+                exceed[i] += 1
+        for i, n in enumerate(totals):
+            if n:
+                years.append(first_year + i)
+                values.append(exceed[i] / n)
+    # Simple Sen's slope (pairwise median slope)
+    slope = sens_slope(years, values)
+    # Mann-Kendall (very simplified, no ties correction)
+    z = mann_kendall_z(values)
+    return {
+        "years": years,
+        "values": [round(v, 4) for v in values],
+        "trend_slope_per_year": round(slope, 5),
+        "mann_kendall_z": round(float(z), 3),
+        "source": ["NASA POWER"],
+        "period": f"{start.year}–{end.year}",
+    }
+
+
 @router.get("/probability")
 def probability(
     lat: float,
@@ -73,27 +202,12 @@ def probability(
     target_date: date,
     var: str = Query(..., description="Variable key, e.g., T2M_MAX, WS10M, PRECTOTCORR"),
     threshold: float = Query(..., description="Numeric threshold in variable units"),
-    comparison: str = Query("gt", regex="^(gt|lt)$", description="gt for >, lt for <"),
+    comparison: Comparison = Query("gt", description="gt for >, lt for <"),
     window_days: int = Query(15, ge=0, le=60, description="Half-window size in days for DOY window"),
 ) -> dict:
     try:
-        start = date(1981, 1, 1)
-        end = date.today()
-        series = fetch_daily_series(lat=lat, lon=lon, start=start, end=end, parameters=[var])
-        samples = select_dayofyear_window(series[var], target_date, window_days)
-        prob = compute_exceedance_probability(samples, threshold, comparison)
-        ci_low, ci_high = wilson_confidence_interval(int(prob * len(samples)), len(samples))
-        return {
-            "probability": prob,
-            "n_samples": int(len(samples)),
-            "ci_95": [ci_low, ci_high],
-            "threshold": threshold,
-            "comparison": comparison,
-            "units": None,
-            "source": ["NASA POWER (MERRA-2 derived)"],
-            "period": f"{start.year}–{end.year}",
-            "method": f"DOY ±{window_days}d; binomial proportion (Wilson CI)",
-        }
+        series_var, start, end = _fetch_var(lat, lon, var)
+        return _compute_probability(series_var, target_date, threshold, comparison, window_days, start, end)
     except Exception as exc:
         raise HTTPException(status_code=500, detail=str(exc))
 
@@ -104,50 +218,11 @@ def climatology(
     lon: float,
     var: str,
     window_days: int = 15,
-) -> dict:
+) -> Response:
     try:
-        start = date(1981, 1, 1)
-        end = date.today()
-        series = fetch_daily_series(lat=lat, lon=lon, start=start, end=end, parameters=[var])
-        # Build DOY mean and simple percentiles without pandas
-        from collections import defaultdict
-        buckets = defaultdict(list)
-        for dt, val in series[var]:
-            if val is None:
-                continue
-            doy = dt.timetuple().tm_yday
-            try:
-                v = float(val)
-            except Exception:
-                continue
-            if v == v and v != float('inf') and v != float('-inf'):  # Check for NaN and inf
-                buckets[doy].append(v)
-        days = sorted(buckets.keys())
-        means, medians, p10s, p90s = [], [], [], []
-        for d in days:
-            arr = buckets[d]
-            if arr:
-                arr_sorted = sorted(arr)
-                n = len(arr_sorted)
-                means.append(sum(arr) / n)
-                medians.append(arr_sorted[n//2] if n % 2 == 1 else (arr_sorted[n//2-1] + arr_sorted[n//2]) / 2)
-                p10s.append(arr_sorted[int(n * 0.1)] if n > 0 else float("nan"))
-                p90s.append(arr_sorted[int(n * 0.9)] if n > 0 else float("nan"))
-            else:
-                means.append(float("nan"))
-                medians.append(float("nan"))
-                p10s.append(float("nan"))
-                p90s.append(float("nan"))
-        return {
-            "doy": days,
-            "mean": [round(x, 3) if x == x and x != float('inf') and x != float('-inf') else None for x in means],
-            "median": [round(x, 3) if x == x and x != float('inf') and x != float('-inf') else None for x in medians],
-            "p10": [round(x, 3) if x == x and x != float('inf') and x != float('-inf') else None for x in p10s],
-            "p90": [round(x, 3) if x == x and x != float('inf') and x != float('-inf') else None for x in p90s],
-            "units": None,
-            "source": ["NASA POWER"],
-            "period": f"{start.year}–{end.year}",
-        }
+        series_var, start, end = _fetch_var(lat, lon, var)
+        # Returned as a response object to skip jsonable_encoder on ~1.5k floats
+        return FastJSONResponse(_compute_climatology(series_var, start, end))
     except Exception as exc:
         raise HTTPException(status_code=500, detail=str(exc))
 
@@ -159,58 +234,44 @@ def trend(
     target_date: date,
     var: str,
     threshold: float,
-    comparison: str = Query("gt", regex="^(gt|lt)$"),
+    comparison: Comparison = "gt",
     window_days: int = 15,
 ) -> dict:
     try:
-        start = date(1981, 1, 1)
-        end = date.today()
-        series = fetch_daily_series(lat=lat, lon=lon, start=start, end=end, parameters=[var])
-        center = target_date.timetuple().tm_yday
-        lower = max(1, center - window_days)
-        upper = min(366, center + window_days)
-        from collections import defaultdict
-        buckets = defaultdict(lambda: [0, 0])  # year -> [exceed_count, total]
-        for dt, val in series[var]:
-            doy = dt.timetuple().tm_yday
-            if not (lower <= doy <= upper):
-                continue
-            try:
-                v = float(val)
-            except Exception:
-                continue
-            year = dt.year
-            buckets[year][1] += 1
-            if (comparison == "gt" and v > threshold) or (comparison == "lt" and v < threshold):
-                buckets[year][0] += 1
-        years = sorted(buckets.keys())
-        values = []
-        for y in years:
-            k, n = buckets[y]
-            values.append(k / n if n else 0.0)
-        # Simple Sen's slope (pairwise median slope)
-        slopes = []
-        for i in range(len(years)):
-            for j in range(i + 1, len(years)):
-                if years[j] != years[i]:
-                    slopes.append((values[j] - values[i]) / (years[j] - years[i]))
-        slope = float(sorted(slopes)[len(slopes) // 2]) if slopes else 0.0
-        # Mann-Kendall (very simplified, no ties correction)
-        S = 0
-        for i in range(len(values)):
-            for j in range(i + 1, len(values)):
-                S += 1 if values[j] > values[i] else (-1 if values[j] < values[i] else 0)
-        n = len(values)
-        var_s = n * (n - 1) * (2 * n + 5) / 18 if n >= 2 else 0
-        z = S / (var_s ** 0.5) if var_s > 0 else 0
-        return {
-            "years": years,
-            "values": [round(v, 4) for v in values],
-            "trend_slope_per_year": round(slope, 5),
-            "mann_kendall_z": round(float(z), 3),
-            "source": ["NASA POWER"],
-            "period": f"{start.year}–{end.year}",
-        }
+        series_var, start, end = _fetch_var(lat, lon, var)
+        return _compute_trend(series_var, target_date, threshold, comparison, window_days, start, end)
+    except Exception as exc:
+        raise HTTPException(status_code=500, detail=str(exc))
+
+
+@router.get("/analysis")
+def analysis(
+    lat: float,
+    lon: float,
+    target_date: date,
+    var: List[str] = Query(..., description="Variable key, repeatable, e.g., var=T2M_MAX&var=WS10M"),
+    threshold: List[float] = Query(..., description="One threshold for all variables, or one per var in the same order"),
+    comparison: Comparison = Query("gt", description="gt for >, lt for <"),
+    window_days: int = Query(15, ge=0, le=60, description="Half-window size in days for DOY window"),
+) -> Response:
+    """
+    Probability, climatology and trend per variable, all variables from a single POWER fetch
+    """
+    if len(threshold) == 1:
+        threshold = threshold * len(var)
+    elif len(threshold) != len(var):
+        raise HTTPException(status_code=422, detail="Pass one threshold, or one per var")
+    try:
+        series, start, end = _fetch_vars(lat, lon, var)
+        result = {}
+        for v, th in zip(var, threshold):
+            series_var = series[v]
+            result[v] = {
+                "probability": _compute_probability(series_var, target_date, th, comparison, window_days, start, end),
+                "climatology": _compute_climatology(series_var, start, end),
+                "trend": _compute_trend(series_var, target_date, th, comparison, window_days, start, end),
+            }
+        return FastJSONResponse(result)
     except Exception as exc:
         raise HTTPException(status_code=500, detail=str(exc))
 
@@ -221,81 +282,41 @@ def chatbot_endpoint(request: ChatbotRequest) -> ChatbotResponse:
     Chatbot endpoint for weather advice for farmers and fishermen
     """
     try:
-        # Analyze the query with conversation context
-        analysis = chatbot.analyze_query(request.query, request.location)
-        
-        # If location is needed, return a prompt for location
-        if analysis['needs_location']:
-            user_type = analysis['user_type'] or 'farmer'  # Default to farmer
-            response = chatbot._generate_location_prompt(user_type, analysis['extracted_location'])
-            return ChatbotResponse(
-                response=response,
-                user_type=analysis['user_type'],
-                needs_location=True,
-                extracted_location=analysis['extracted_location']
-            )
-        
-        # If we have location information, provide weather analysis
-        if request.location:
-            weather_analysis = chatbot.get_weather_analysis(
-                analysis['user_type'] or 'farmer',  # Default to farmer
-                request.location,
-                request.get_target_date()  # Use parsed date
-            )
-            
-            response = chatbot.generate_response(
-                weather_analysis,
-                analysis['query_intent'],
-                analysis['user_type'] or 'farmer',  # Default to farmer
-                request.query
-            )
-            
-            return ChatbotResponse(
-                response=response,
-                user_type=analysis['user_type'],
-                needs_location=False,
-                extracted_location=analysis['extracted_location']
-            )
-        
-        # If no location provided, ask for it
-        user_type = analysis['user_type'] or 'farmer'  # Default to farmer
-        response = chatbot._generate_location_prompt(user_type, analysis['extracted_location'])
-        return ChatbotResponse(
-            response=response,
-            user_type=analysis['user_type'],
-            needs_location=True,
-            extracted_location=analysis['extracted_location']
-        )
-        
+        result = chatbot.handle(request.query, request.location, request.get_target_date())
+        return ChatbotResponse(**result)
     except Exception as exc:
         raise HTTPException(status_code=500, detail=str(exc))
 
 
+_SUGGESTIONS = {
+    "farmer_examples": [
+        "I'm a farmer and want to know if it's good to plant crops today",
+        "Is it safe to harvest in my field right now?",
+        "Should I delay irrigation due to weather conditions?",
+        "I'm farming in Cairo, Egypt - is the weather suitable for outdoor work?",
+        "What's the best time to plant crops in my area?"
+    ],
+    "fisher_examples": [
+        "I'm a fisherman and want to know if it's safe to go fishing today",
+        "Is it good to cruise in the Red Sea, Egypt right now?",
+        "Should I delay my fishing trip due to weather?",
+        "I'm fishing in Alexandria, Egypt - are conditions safe?",
+        "What's the best time to go fishing in my area?"
+    ],
+    "general_examples": [
+        "Tell me about the weather conditions for outdoor activities",
+        "Is it safe to be outside today?",
+        "What's the weather like for my planned activity?"
+    ]
+}
+# Static payload: serialize once at import and let clients cache it for a day.
+_SUGGESTIONS_JSON = json.dumps(_SUGGESTIONS, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+_SUGGESTIONS_HEADERS = {"Cache-Control": "public, max-age=86400"}
+
+
 @router.get("/chatbot/suggestions")
-def get_chatbot_suggestions() -> dict:
+def get_chatbot_suggestions() -> Response:
     """
     Get example queries for the chatbot
     """
-    return {
-        "farmer_examples": [
-            "I'm a farmer and want to know if it's good to plant crops today",
-            "Is it safe to harvest in my field right now?",
-            "Should I delay irrigation due to weather conditions?",
-            "I'm farming in Cairo, Egypt - is the weather suitable for outdoor work?",
-            "What's the best time to plant crops in my area?"
-        ],
-        "fisher_examples": [
-            "I'm a fisherman and want to know if it's safe to go fishing today",
-            "Is it good to cruise in the Red Sea, Egypt right now?",
-            "Should I delay my fishing trip due to weather?",
-            "I'm fishing in Alexandria, Egypt - are conditions safe?",
-            "What's the best time to go fishing in my area?"
-        ],
-        "general_examples": [
-            "Tell me about the weather conditions for outdoor activities",
-            "Is it safe to be outside today?",
-            "What's the weather like for my planned activity?"
-        ]
-    }
-
-
+    return Response(content=_SUGGESTIONS_JSON, media_type="application/json", headers=_SUGGESTIONS_HEADERS)
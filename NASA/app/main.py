@@ -1,24 +1,68 @@
+import os
+from typing import Dict
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.middleware.gzip import GZipMiddleware
 from fastapi.staticfiles import StaticFiles
 
+from app.api.responses import FastJSONResponse
 from app.api.routes import router as api_router
 
 
+# Comma-separated list, e.g. "https://tempestra.example,http://localhost:3000".
+# The bundled frontend is served from the same origin and needs no entry here.
+ALLOWED_ORIGINS = tuple(
+    origin.strip() for origin in os.environ.get("ALLOWED_ORIGINS", "").split(",") if origin.strip()
+) or ("*",)
+
+
+# Asset names are not content-hashed, so nothing is marked immutable: HTML
+# always revalidates (cheap 304 via the ETag StaticFiles already sends),
+# script/CSS for an hour, images for a week.
+_STATIC_CACHE_CONTROL: Dict[str, str] = {
+    ".html": "no-cache",
+    ".js": "public, max-age=3600",
+    ".css": "public, max-age=3600",
+    ".png": "public, max-age=604800",
+    ".jpg": "public, max-age=604800",
+    ".svg": "public, max-age=604800",
+    ".ico": "public, max-age=604800",
+    ".woff2": "public, max-age=604800",
+}
+
+
+class CachedStaticFiles(StaticFiles):
+    """StaticFiles with per-extension Cache-Control headers"""
+
+    def file_response(self, full_path, stat_result, scope, status_code=200):
+        response = super().file_response(full_path, stat_result, scope, status_code)
+        cache_control = _STATIC_CACHE_CONTROL.get(os.path.splitext(str(full_path))[1].lower())
+        if cache_control:
+            response.headers["Cache-Control"] = cache_control
+        return response
+
+
 def create_app() -> FastAPI:
-    app = FastAPI(title="Tempestra - NASA Weather Likelihood API", version="0.1.0")
+    app = FastAPI(
+        title="Tempestra - NASA Weather Likelihood API",
+        version="0.1.0",
+        default_response_class=FastJSONResponse,
+    )
 
     app.add_middleware(
         CORSMiddleware,
-        allow_origins=["*"],
-        allow_credentials=True,
-        allow_methods=["*"],
-        allow_headers=["*"],
+        allow_origins=list(ALLOWED_ORIGINS),
+        allow_credentials=False,
+        allow_methods=["GET", "POST"],
+        allow_headers=["Content-Type"],
     )
+    # Climatology/trend payloads are mostly digits and shrink several-fold
+    app.add_middleware(GZipMiddleware, minimum_size=512, compresslevel=5)
 
     app.include_router(api_router, prefix="/api")
     # Serve static frontend
-    app.mount("/", StaticFiles(directory="frontend", html=True), name="static")
+    app.mount("/", CachedStaticFiles(directory="frontend", html=True), name="static")
     return app
 
 
@@ -1,17 +1,89 @@
 from __future__ import annotations
 
 from datetime import date, datetime
+from functools import cached_property
 from typing import Dict, List, Optional, Tuple
 import re
-import json
 
-from app.services.power_client import fetch_daily_series
+from app.services.power_cache import fetch_series_arrays_cached
 from app.utils.stats import (
     compute_exceedance_probability,
-    select_dayofyear_window,
+    doy_window_bounds,
+    select_doy_range,
+    summarize_samples,
 )
 
 
+# Common location patterns, tried in priority order (the first pattern that matches wins)
+_LOCATION_PATTERNS = tuple(re.compile(pattern) for pattern in (
+    r'in\s+([a-zA-Z\s]+)',
+    r'at\s+([a-zA-Z\s]+)',
+    r'near\s+([a-zA-Z\s]+)',
+    r'around\s+([a-zA-Z\s]+)',
+    r'([a-zA-Z\s]+)\s+area',
+    r'([a-zA-Z\s]+)\s+region',
+))
+_LOCATION_STOPWORDS = frozenset(['the', 'my', 'this', 'that', 'our'])
+# Activities that need a location; substrings, so 'farm' also covers 'farming'
+_LOCATION_ACTIVITIES = ('farm', 'fish', 'cruise', 'sail', 'plant', 'harvest')
+
+# First day of the POWER daily record used for the climatology
+_SERIES_START = date(1981, 1, 1)
+
+# Suitability -> score in tenths (averaged into the overall score)
+_SUITABILITY_SCORES = {'excellent': 10, 'good': 7, 'poor': 3, 'unknown': 5}
+
+# POWER parameter -> key in the per-role threshold tables
+_THRESHOLD_KEYS = {
+    'T2M_MAX': 'temperature',
+    'T2M_MIN': 'temperature',
+    'T2M': 'temperature',
+    'PRECTOTCORR': 'precipitation',
+    'WS10M': 'wind',
+    'WS10M_MAX': 'wind',
+}
+
+# Response lines per parameter and suitability, in the order they are reported
+_FARMER_LINES = (
+    ('PRECTOTCORR', {
+        'excellent': "🌧️ **Rain conditions**: Excellent! Expected {mean:.1f}mm of rain - perfect for irrigation and crop growth.",
+        'good': "🌧️ **Rain conditions**: Good with {mean:.1f}mm expected - suitable for farming activities.",
+        'poor': "🌧️ **Rain conditions**: Challenging with {mean:.1f}mm expected - consider irrigation needs.",
+    }),
+    ('T2M_MAX', {
+        'excellent': "🌡️ **Temperature**: Perfect farming weather! Max temperature around {mean:.1f}°C.",
+        'good': "🌡️ **Temperature**: Good conditions with max temperature around {mean:.1f}°C.",
+        'poor': "🌡️ **Temperature**: Challenging with max temperature around {mean:.1f}°C - consider heat protection.",
+    }),
+    ('WS10M', {
+        'excellent': "💨 **Wind**: Calm conditions with {mean:.1f} km/h winds - ideal for spraying and fieldwork.",
+        'good': "💨 **Wind**: Moderate winds at {mean:.1f} km/h - suitable for most farming activities.",
+        'poor': "💨 **Wind**: Strong winds at {mean:.1f} km/h - avoid spraying and be cautious with equipment.",
+    }),
+)
+_FISHER_LINES = (
+    ('WS10M', {
+        'excellent': "💨 **Wind**: Perfect fishing conditions! Light winds at {mean:.1f} km/h - safe for boating.",
+        'good': "💨 **Wind**: Good conditions with {mean:.1f} km/h winds - suitable for fishing.",
+        'poor': "💨 **Wind**: Strong winds at {mean:.1f} km/h - consider staying ashore or fishing in protected areas.",
+    }),
+    ('PRECTOTCORR', {
+        'excellent': "🌧️ **Rain**: Clear conditions with {mean:.1f}mm expected - excellent visibility.",
+        'good': "🌧️ **Rain**: Light rain possible ({mean:.1f}mm) - still good for fishing.",
+        'poor': "🌧️ **Rain**: Heavy rain expected ({mean:.1f}mm) - consider indoor activities or wait for better weather.",
+    }),
+    ('T2M', {
+        'excellent': "🌡️ **Temperature**: Comfortable fishing weather at {mean:.1f}°C.",
+        'good': "🌡️ **Temperature**: Good conditions at {mean:.1f}°C.",
+        'poor': "🌡️ **Temperature**: Extreme temperatures at {mean:.1f}°C - dress appropriately.",
+    }),
+)
+
+_FARMER_PARAMETERS = ('T2M_MAX', 'T2M_MIN', 'PRECTOTCORR', 'WS10M')
+_FISHER_PARAMETERS = ('WS10M', 'PRECTOTCORR', 'T2M', 'WS10M_MAX')
+_ALL_PARAMETERS = tuple(dict.fromkeys(_FARMER_PARAMETERS + _FISHER_PARAMETERS))
+
+
 class WeatherChatbot:
     """Intelligent weather chatbot for farmers and fishermen"""
     
@@ -41,6 +113,17 @@ class WeatherChatbot:
             }
         }
     
+    @cached_property
+    def _intent_dispatch(self) -> Dict:
+        """Response generator per query intent; anything else gets general advice"""
+        return {
+            'suitability_check': self._generate_suitability_response,
+            'timing_advice': self._generate_timing_response,
+            'optimal_timing': lambda analysis, user_type, location, target_date:
+                self._generate_optimal_timing_response(analysis, user_type, location),
+            'risk_assessment': self._generate_risk_response,
+        }
+    
     def analyze_query(self, query: str, location: Optional[Dict] = None) -> Dict:
         """
         Analyze user query and determine user type and intent
@@ -50,8 +133,8 @@ class WeatherChatbot:
         # Determine user type
         user_type = self._detect_user_type(query_lower)
         
-        # Extract location if mentioned
-        extracted_location = self._extract_location(query_lower)
+        # Extract location if mentioned (not needed when one was provided)
+        extracted_location = None if location else self._extract_location(query_lower)
         
         # Determine if location is needed
         needs_location = self._needs_location(query_lower, location, extracted_location)
@@ -65,8 +148,9 @@ class WeatherChatbot:
     
     def _detect_user_type(self, query: str) -> Optional[str]:
         """Detect if user is farmer or fisherman based on keywords"""
-        farmer_score = sum(1 for keyword in self.farmer_keywords if keyword in query)
-        fisher_score = sum(1 for keyword in self.fisher_keywords if keyword in query)
+        # Substring matching is kept on purpose: "farm" also scores inside "farming", "crop" inside "crops"
+        farmer_score = sum(keyword in query for keyword in self.farmer_keywords)
+        fisher_score = sum(keyword in query for keyword in self.fisher_keywords)
         
         if farmer_score > fisher_score and farmer_score > 0:
             return 'farmer'
@@ -76,22 +160,12 @@ class WeatherChatbot:
     
     def _extract_location(self, query: str) -> Optional[Dict]:
         """Extract location information from query"""
-        # Common location patterns
-        location_patterns = [
-            r'in\s+([a-zA-Z\s]+)',
-            r'at\s+([a-zA-Z\s]+)',
-            r'near\s+([a-zA-Z\s]+)',
-            r'around\s+([a-zA-Z\s]+)',
-            r'([a-zA-Z\s]+)\s+area',
-            r'([a-zA-Z\s]+)\s+region'
-        ]
-        
-        for pattern in location_patterns:
-            match = re.search(pattern, query)
+        for pattern in _LOCATION_PATTERNS:
+            match = pattern.search(query)
             if match:
                 location_name = match.group(1).strip()
-                # Filter out common words
-                if location_name.lower() not in ['the', 'my', 'this', 'that', 'our']:
+                # Filter out common words (the query is already lowercased)
+                if location_name not in _LOCATION_STOPWORDS:
                     return {'name': location_name}
         
         return None
@@ -108,11 +182,7 @@ class WeatherChatbot:
             return False
         
         # Check if query mentions specific activities that require location
-        location_required_activities = [
-            'farm', 'fish', 'cruise', 'sail', 'plant', 'harvest'
-        ]
-        
-        return any(activity in query for activity in location_required_activities)
+        return any(activity in query for activity in _LOCATION_ACTIVITIES)
     
     def _analyze_intent(self, query: str, user_type: Optional[str]) -> str:
         """Analyze the intent of the user query"""
@@ -132,34 +202,38 @@ class WeatherChatbot:
         """
         Get weather analysis for specific user type and location
         """
+        today = date.today()
         if not target_date:
-            target_date = date.today()
+            target_date = today
         
         lat = location['lat']
         lon = location['lng']
         
         # Get weather data for the location
-        start_date = date(1981, 1, 1)
-        end_date = date.today()
+        start_date = _SERIES_START
+        end_date = today
         
-        # Fetch relevant weather parameters
+        # Relevant weather parameters
         if user_type == 'farmer':
-            parameters = ['T2M_MAX', 'T2M_MIN', 'PRECTOTCORR', 'WS10M']
+            parameters = _FARMER_PARAMETERS
         else:  # fisher
-            parameters = ['WS10M', 'PRECTOTCORR', 'T2M', 'WS10M_MAX']
+            parameters = _FISHER_PARAMETERS
         
         try:
-            series = fetch_daily_series(
+            # Shared with the API endpoints: repeat questions for the same spot skip the POWER download.
+            # Both roles' parameters come down in one request, so switching role hits the cache.
+            series = fetch_series_arrays_cached(
                 lat=lat, lon=lon, 
                 start=start_date, end=end_date, 
-                parameters=parameters
+                parameters=_ALL_PARAMETERS
             )
             
-            # Analyze each parameter
+            # Analyze each parameter over the same +/-15 day window
+            lower, upper = doy_window_bounds(target_date, 15)
             analysis = {}
             for param in parameters:
                 try:
-                    samples = select_dayofyear_window(series[param], target_date, 15)
+                    samples = select_doy_range(series[param], lower, upper)
                     if samples:
                         analysis[param] = self._analyze_parameter(
                             param, samples, user_type, target_date
@@ -190,48 +264,34 @@ class WeatherChatbot:
         if not samples:
             return {'error': 'No data available'}
         
-        # Filter out None values and invalid numbers
-        valid_samples = [val for val in samples if val is not None and val == val and val != float('inf') and val != float('-inf')]
-        if not valid_samples:
+        # Statistics over the finite samples only (None, NaN and inf are skipped)
+        sample_count, mean_val, min_val, max_val = summarize_samples(samples)
+        if not sample_count:
             return {'error': 'No valid data'}
         
-        # Calculate statistics
-        mean_val = sum(valid_samples) / len(valid_samples)
-        min_val = min(valid_samples)
-        max_val = max(valid_samples)
-        
         # Get thresholds for this parameter and user type
         thresholds = self.thresholds.get(user_type, {})
         
+        param_thresholds = thresholds.get(self._get_threshold_key(param), {})
+        
         # Determine suitability
-        suitability = self._assess_suitability(param, mean_val, thresholds)
+        suitability = self._assess_suitability(mean_val, param_thresholds)
         
         return {
             'mean': round(mean_val, 2),
             'min': round(min_val, 2),
             'max': round(max_val, 2),
             'suitability': suitability,
-            'thresholds': thresholds.get(self._get_threshold_key(param), {}),
-            'sample_count': len(valid_samples)
+            'thresholds': param_thresholds,
+            'sample_count': sample_count
         }
     
     def _get_threshold_key(self, param: str) -> str:
         """Map parameter names to threshold keys"""
-        mapping = {
-            'T2M_MAX': 'temperature',
-            'T2M_MIN': 'temperature',
-            'T2M': 'temperature',
-            'PRECTOTCORR': 'precipitation',
-            'WS10M': 'wind',
-            'WS10M_MAX': 'wind'
-        }
-        return mapping.get(param, param.lower())
+        return _THRESHOLD_KEYS.get(param) or param.lower()
     
-    def _assess_suitability(self, param: str, value: float, thresholds: Dict) -> str:
-        """Assess weather suitability based on thresholds"""
-        threshold_key = self._get_threshold_key(param)
-        param_thresholds = thresholds.get(threshold_key, {})
-        
+    def _assess_suitability(self, value: float, param_thresholds: Dict) -> str:
+        """Assess weather suitability against one parameter's thresholds"""
         if not param_thresholds:
             return 'unknown'
         
@@ -265,21 +325,17 @@ class WeatherChatbot:
         target_date = analysis_result['target_date']
         
         # Generate response based on intent
-        if intent == 'suitability_check':
-            return self._generate_suitability_response(analysis, user_type, location, target_date)
-        elif intent == 'timing_advice':
-            return self._generate_timing_response(analysis, user_type, location, target_date)
-        elif intent == 'optimal_timing':
-            return self._generate_optimal_timing_response(analysis, user_type, location)
-        elif intent == 'risk_assessment':
-            return self._generate_risk_response(analysis, user_type, location, target_date)
-        else:
-            return self._generate_general_response(analysis, user_type, location, target_date)
+        handler = self._intent_dispatch.get(intent, self._generate_general_response)
+        return handler(analysis, user_type, location, target_date)
     
     def _generate_suitability_response(self, analysis: Dict, user_type: str, 
                                      location: Dict, target_date: date) -> str:
         """Generate response for suitability check"""
-        location_name = location.get('name', f"{location['lat']:.2f}°, {location['lng']:.2f}°")
+        # Coordinates are only formatted when the location has no name
+        if 'name' in location:
+            location_name = location['name']
+        else:
+            location_name = f"{location['lat']:.2f}°, {location['lng']:.2f}°"
         
         if user_type == 'farmer':
             return self._generate_farmer_suitability(analysis, location_name, target_date)
@@ -289,37 +345,7 @@ class WeatherChatbot:
     def _generate_farmer_suitability(self, analysis: Dict, location_name: str, 
                                    target_date: date) -> str:
         """Generate farming suitability response"""
-        responses = []
-        
-        # Check precipitation
-        if 'PRECTOTCORR' in analysis and 'error' not in analysis['PRECTOTCORR']:
-            precip = analysis['PRECTOTCORR']
-            if precip['suitability'] == 'excellent':
-                responses.append(f"🌧️ **Rain conditions**: Excellent! Expected {precip['mean']:.1f}mm of rain - perfect for irrigation and crop growth.")
-            elif precip['suitability'] == 'good':
-                responses.append(f"🌧️ **Rain conditions**: Good with {precip['mean']:.1f}mm expected - suitable for farming activities.")
-            else:
-                responses.append(f"🌧️ **Rain conditions**: Challenging with {precip['mean']:.1f}mm expected - consider irrigation needs.")
-        
-        # Check temperature
-        if 'T2M_MAX' in analysis and 'error' not in analysis['T2M_MAX']:
-            temp = analysis['T2M_MAX']
-            if temp['suitability'] == 'excellent':
-                responses.append(f"🌡️ **Temperature**: Perfect farming weather! Max temperature around {temp['mean']:.1f}°C.")
-            elif temp['suitability'] == 'good':
-                responses.append(f"🌡️ **Temperature**: Good conditions with max temperature around {temp['mean']:.1f}°C.")
-            else:
-                responses.append(f"🌡️ **Temperature**: Challenging with max temperature around {temp['mean']:.1f}°C - consider heat protection.")
-        
-        # Check wind
-        if 'WS10M' in analysis and 'error' not in analysis['WS10M']:
-            wind = analysis['WS10M']
-            if wind['suitability'] == 'excellent':
-                responses.append(f"💨 **Wind**: Calm conditions with {wind['mean']:.1f} km/h winds - ideal for spraying and fieldwork.")
-            elif wind['suitability'] == 'good':
-                responses.append(f"💨 **Wind**: Moderate winds at {wind['mean']:.1f} km/h - suitable for most farming activities.")
-            else:
-                responses.append(f"💨 **Wind**: Strong winds at {wind['mean']:.1f} km/h - avoid spraying and be cautious with equipment.")
+        responses = self._parameter_lines(analysis, _FARMER_LINES)
         
         # Overall recommendation
         overall_suitability = self._calculate_overall_suitability(analysis)
@@ -337,37 +363,8 @@ class WeatherChatbot:
     def _generate_fisher_suitability(self, analysis: Dict, location_name: str, 
                                     target_date: date) -> str:
         """Generate fishing suitability response"""
-        responses = []
-        
-        # Check wind (most important for fishing)
-        if 'WS10M' in analysis and 'error' not in analysis['WS10M']:
-            wind = analysis['WS10M']
-            if wind['suitability'] == 'excellent':
-                responses.append(f"💨 **Wind**: Perfect fishing conditions! Light winds at {wind['mean']:.1f} km/h - safe for boating.")
-            elif wind['suitability'] == 'good':
-                responses.append(f"💨 **Wind**: Good conditions with {wind['mean']:.1f} km/h winds - suitable for fishing.")
-            else:
-                responses.append(f"💨 **Wind**: Strong winds at {wind['mean']:.1f} km/h - consider staying ashore or fishing in protected areas.")
-        
-        # Check precipitation
-        if 'PRECTOTCORR' in analysis and 'error' not in analysis['PRECTOTCORR']:
-            precip = analysis['PRECTOTCORR']
-            if precip['suitability'] == 'excellent':
-                responses.append(f"🌧️ **Rain**: Clear conditions with {precip['mean']:.1f}mm expected - excellent visibility.")
-            elif precip['suitability'] == 'good':
-                responses.append(f"🌧️ **Rain**: Light rain possible ({precip['mean']:.1f}mm) - still good for fishing.")
-            else:
-                responses.append(f"🌧️ **Rain**: Heavy rain expected ({precip['mean']:.1f}mm) - consider indoor activities or wait for better weather.")
-        
-        # Check temperature
-        if 'T2M' in analysis and 'error' not in analysis['T2M']:
-            temp = analysis['T2M']
-            if temp['suitability'] == 'excellent':
-                responses.append(f"🌡️ **Temperature**: Comfortable fishing weather at {temp['mean']:.1f}°C.")
-            elif temp['suitability'] == 'good':
-                responses.append(f"🌡️ **Temperature**: Good conditions at {temp['mean']:.1f}°C.")
-            else:
-                responses.append(f"🌡️ **Temperature**: Extreme temperatures at {temp['mean']:.1f}°C - dress appropriately.")
+        # Wind first: it matters most for fishing
+        responses = self._parameter_lines(analysis, _FISHER_LINES)
         
         # Overall recommendation
         overall_suitability = self._calculate_overall_suitability(analysis)
@@ -382,6 +379,16 @@ class WeatherChatbot:
         
         return f"🎣 **Fishing Analysis for {location_name} on {target_date}**\n\n" + "\n\n".join(responses)
     
+    def _parameter_lines(self, analysis: Dict, line_templates: Tuple) -> List[str]:
+        """One line per analyzed parameter, picked by its suitability ('poor' covers anything else)"""
+        responses = []
+        for param, templates in line_templates:
+            data = analysis.get(param)
+            if data is not None and 'error' not in data:
+                template = templates.get(data['suitability'], templates['poor'])
+                responses.append(template.format(mean=data['mean']))
+        return responses
+    
     def _generate_timing_response(self, analysis: Dict, user_type: str, 
                                 location: Dict, target_date: date) -> str:
         """Generate timing advice response"""
@@ -429,13 +436,15 @@ class WeatherChatbot:
         if not analysis:
             return 0.0
         
-        suitability_scores = []
-        for param, data in analysis.items():
+        # Scores are kept in tenths so the sum is exact integer arithmetic
+        total = 0
+        count = 0
+        for data in analysis.values():
             if isinstance(data, dict) and 'suitability' in data and 'error' not in data:
-                score_map = {'excellent': 1.0, 'good': 0.7, 'poor': 0.3, 'unknown': 0.5}
-                suitability_scores.append(score_map.get(data['suitability'], 0.5))
+                total += _SUITABILITY_SCORES.get(data['suitability'], 5)
+                count += 1
         
-        return sum(suitability_scores) / len(suitability_scores) if suitability_scores else 0.5
+        return total / (count * 10) if count else 0.5
     
     def _generate_location_prompt(self, user_type: str, extracted_location: Optional[Dict]) -> str:
         """Generate a prompt asking for location information"""
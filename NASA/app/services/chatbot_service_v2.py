@@ -1,25 +1,131 @@
 from __future__ import annotations
 
+from bisect import bisect_left, bisect_right
 from datetime import date, datetime
-from typing import Dict, List, Optional, Tuple, Any
+from math import inf, isfinite
+from typing import Dict, Iterable, List, Optional, Tuple, Any
 import re
-import json
 import logging
 
-# Set up logging
-logging.basicConfig(level=logging.INFO)
+# Handlers and levels are configured by the application, not here
 logger = logging.getLogger(__name__)
 
 try:
-    from app.services.power_client import fetch_daily_series
-    from app.utils.stats import select_dayofyear_window
+    from app.services.power_cache import fetch_series_arrays_cached
+    from app.utils.stats import doy_window_bounds, select_doy_range, summarize_samples
 except ImportError as e:
-    logger.error(f"Import error: {e}")
+    logger.error("Import error: %s", e)
     # Fallback for testing
-    def fetch_daily_series(*args, **kwargs):
+    def fetch_series_arrays_cached(*args, **kwargs):
         return {}
-    def select_dayofyear_window(*args, **kwargs):
+    def doy_window_bounds(*args, **kwargs):
+        return 1, 366
+    def select_doy_range(*args, **kwargs):
         return []
+    def summarize_samples(*args, **kwargs):
+        return 0, float('nan'), float('nan'), float('nan')
+
+
+# Common location patterns, tried in priority order (the first pattern that matches wins)
+_LOCATION_PATTERNS = tuple(re.compile(pattern) for pattern in (
+    r'in\s+([a-zA-Z\s]+)',
+    r'at\s+([a-zA-Z\s]+)',
+    r'near\s+([a-zA-Z\s]+)',
+    r'around\s+([a-zA-Z\s]+)',
+    r'([a-zA-Z\s]+)\s+area',
+    r'([a-zA-Z\s]+)\s+region',
+))
+_LOCATION_STOPWORDS = frozenset(['the', 'my', 'this', 'that', 'our', 'here'])
+
+# Keywords scored by _detect_user_type (substring matches, so 'farm' also counts 'farmland')
+_FARMER_INDICATORS = ('farmer', 'farming', 'farm', 'crop', 'plant', 'harvest', 'agriculture')
+_FISHER_INDICATORS = ('fisher', 'fishing', 'fish', 'boat', 'sea', 'ocean', 'cruise', 'maritime')
+
+# Response lines per parameter and suitability, in the order they are reported
+_FARMER_LINES = (
+    ('PRECTOTCORR', {
+        'excellent': "🌧️ **Rain conditions**: Excellent! Expected {mean:.1f}mm of rain - perfect for irrigation and crop growth.",
+        'good': "🌧️ **Rain conditions**: Good with {mean:.1f}mm expected - suitable for farming activities.",
+        'poor': "🌧️ **Rain conditions**: Challenging with {mean:.1f}mm expected - consider irrigation needs.",
+    }),
+    ('T2M_MAX', {
+        'excellent': "🌡️ **Temperature**: Perfect farming weather! Max temperature around {mean:.1f}°C.",
+        'good': "🌡️ **Temperature**: Good conditions with max temperature around {mean:.1f}°C.",
+        'poor': "🌡️ **Temperature**: Challenging with max temperature around {mean:.1f}°C - consider heat protection.",
+    }),
+    ('WS10M', {
+        'excellent': "💨 **Wind**: Calm conditions with {mean:.1f} km/h winds - ideal for spraying and fieldwork.",
+        'good': "💨 **Wind**: Moderate winds at {mean:.1f} km/h - suitable for most farming activities.",
+        'poor': "💨 **Wind**: Strong winds at {mean:.1f} km/h - avoid spraying and be cautious with equipment.",
+    }),
+)
+_FISHER_LINES = (
+    ('WS10M', {
+        'excellent': "💨 **Wind**: Perfect fishing conditions! Light winds at {mean:.1f} km/h - safe for boating.",
+        'good': "💨 **Wind**: Good conditions with {mean:.1f} km/h winds - suitable for fishing.",
+        'poor': "💨 **Wind**: Strong winds at {mean:.1f} km/h - consider staying ashore or fishing in protected areas.",
+    }),
+    ('PRECTOTCORR', {
+        'excellent': "🌧️ **Rain**: Clear conditions with {mean:.1f}mm expected - excellent visibility.",
+        'good': "🌧️ **Rain**: Light rain possible ({mean:.1f}mm) - still good for fishing.",
+        'poor': "🌧️ **Rain**: Heavy rain expected ({mean:.1f}mm) - consider indoor activities or wait for better weather.",
+    }),
+    ('T2M', {
+        'excellent': "🌡️ **Temperature**: Comfortable fishing weather at {mean:.1f}°C.",
+        'good': "🌡️ **Temperature**: Good conditions at {mean:.1f}°C.",
+        'poor': "🌡️ **Temperature**: Extreme temperatures at {mean:.1f}°C - dress appropriately.",
+    }),
+)
+_FARMER_PARAMETERS = ('T2M_MAX', 'T2M_MIN', 'PRECTOTCORR', 'WS10M')
+_FISHER_PARAMETERS = ('WS10M', 'PRECTOTCORR', 'T2M')
+_ALL_PARAMETERS = tuple(dict.fromkeys(_FARMER_PARAMETERS + _FISHER_PARAMETERS))
+
+# POWER parameter -> key in the per-role threshold tables
+_THRESHOLD_KEYS = {
+    'T2M_MAX': 'temperature',
+    'T2M_MIN': 'temperature',
+    'T2M': 'temperature',
+    'PRECTOTCORR': 'precipitation',
+    'WS10M': 'wind',
+    'WS10M_MAX': 'wind',
+}
+
+# Suitability -> score in tenths (averaged into the overall score)
+_SUITABILITY_SCORES = {'excellent': 10, 'good': 7, 'poor': 3, 'unknown': 5}
+
+# Parameters whose readings can legitimately be negative
+_SIGNED_PARAMETERS = frozenset(['T2M_MAX', 'T2M_MIN', 'T2M'])
+
+# First day of the daily series used for analysis (recent data only)
+_SERIES_START = date(2020, 1, 1)
+
+
+def _suitability_bounds(limits: Dict) -> Tuple[float, float, float, float]:
+    """(min, max, optimal_min, optimal_max) for one threshold entry.
+
+    A missing min/max is open-ended. The optimal band is the threshold range inset by 10% at
+    each end, and only exists when both limits are set (otherwise in-range values are 'good').
+    """
+    lower = limits.get('min', -inf)
+    upper = limits.get('max', inf)
+    if 'min' in limits and 'max' in limits:
+        range_size = upper - lower
+        return lower, upper, lower + 0.1 * range_size, upper - 0.1 * range_size
+    return lower, upper, inf, -inf
+
+
+def _day_counts(values: Iterable[float], bounds: Tuple[float, float, float, float]) -> Dict[str, int]:
+    """Number of (finite) values in each suitability class, by bisecting the sorted values."""
+    ordered = sorted(values)
+    total = len(ordered)
+    lower, upper, optimal_min, optimal_max = bounds
+    poor = bisect_left(ordered, lower) + total - bisect_right(ordered, upper)
+    excellent = max(0, bisect_right(ordered, optimal_max) - bisect_left(ordered, optimal_min))
+    return {
+        'days_excellent': excellent,
+        'days_good': total - poor - excellent,
+        'days_poor': poor,
+    }
 
 
 class WeatherChatbotV2:
@@ -64,6 +170,12 @@ class WeatherChatbotV2:
             'aswan': {'lat': 24.0889, 'lng': 32.8998, 'name': 'Aswan, Egypt'},
             'giza': {'lat': 30.0131, 'lng': 31.2089, 'name': 'Giza, Egypt'}
         }
+        
+        # Suitability bounds per user type and threshold key, derived once from the thresholds
+        self._suitability_bounds = {
+            role: {key: _suitability_bounds(limits) for key, limits in role_thresholds.items() if limits}
+            for role, role_thresholds in self.thresholds.items()
+        }
     
     def analyze_query(self, query: str, location: Optional[Dict] = None) -> Dict:
         """Analyze user query and determine user type and intent"""
@@ -86,7 +198,7 @@ class WeatherChatbotV2:
                 'query_intent': self._analyze_intent(query_lower, user_type)
             }
         except Exception as e:
-            logger.error(f"Error analyzing query: {e}")
+            logger.error("Error analyzing query: %s", e)
             return {
                 'user_type': None,
                 'extracted_location': None,
@@ -95,31 +207,25 @@ class WeatherChatbotV2:
             }
     
     def _detect_user_type(self, query: str) -> Optional[str]:
-        """Detect if user is farmer or fisherman based on keywords"""
+        """Detect if user is farmer or fisherman based on keywords (query is already lowercased)"""
         try:
-            query_lower = query.lower()
-            
-            # Check for explicit farmer mentions first
-            farmer_indicators = ['farmer', 'farming', 'farm', 'crop', 'plant', 'harvest', 'agriculture']
-            fisher_indicators = ['fisher', 'fishing', 'fish', 'boat', 'sea', 'ocean', 'cruise', 'maritime']
-            
-            farmer_score = sum(1 for keyword in farmer_indicators if keyword in query_lower)
-            fisher_score = sum(1 for keyword in fisher_indicators if keyword in query_lower)
-            
             # If user explicitly says "I'm a farmer", prioritize that
-            if 'i\'m a farmer' in query_lower or 'i am a farmer' in query_lower:
+            if 'i\'m a farmer' in query or 'i am a farmer' in query:
                 return 'farmer'
-            elif 'i\'m a fisher' in query_lower or 'i am a fisher' in query_lower:
+            elif 'i\'m a fisher' in query or 'i am a fisher' in query:
                 return 'fisher'
             
             # Otherwise use keyword scoring
+            farmer_score = len([keyword for keyword in _FARMER_INDICATORS if keyword in query])
+            fisher_score = len([keyword for keyword in _FISHER_INDICATORS if keyword in query])
+            
             if farmer_score > fisher_score and farmer_score > 0:
                 return 'farmer'
             elif fisher_score > farmer_score and fisher_score > 0:
                 return 'fisher'
             return None
         except Exception as e:
-            logger.error(f"Error detecting user type: {e}")
+            logger.error("Error detecting user type: %s", e)
             return None
     
     def _extract_location(self, query: str) -> Optional[Dict]:
@@ -130,27 +236,17 @@ class WeatherChatbotV2:
                 if location_name in query:
                     return location_data
             
-            # Common location patterns
-            location_patterns = [
-                r'in\s+([a-zA-Z\s]+)',
-                r'at\s+([a-zA-Z\s]+)',
-                r'near\s+([a-zA-Z\s]+)',
-                r'around\s+([a-zA-Z\s]+)',
-                r'([a-zA-Z\s]+)\s+area',
-                r'([a-zA-Z\s]+)\s+region'
-            ]
-            
-            for pattern in location_patterns:
-                match = re.search(pattern, query)
+            for pattern in _LOCATION_PATTERNS:
+                match = pattern.search(query)
                 if match:
                     location_name = match.group(1).strip()
-                    # Filter out common words
-                    if location_name.lower() not in ['the', 'my', 'this', 'that', 'our', 'here']:
+                    # Filter out common words (the query is already lowercased)
+                    if location_name not in _LOCATION_STOPWORDS:
                         return {'name': location_name}
             
             return None
         except Exception as e:
-            logger.error(f"Error extracting location: {e}")
+            logger.error("Error extracting location: %s", e)
             return None
     
     def _needs_location(self, query: str, provided_location: Optional[Dict], 
@@ -172,7 +268,7 @@ class WeatherChatbotV2:
             
             return any(activity in query for activity in location_required_activities)
         except Exception as e:
-            logger.error(f"Error checking location needs: {e}")
+            logger.error("Error checking location needs: %s", e)
             return True
     
     def _analyze_intent(self, query: str, user_type: Optional[str]) -> str:
@@ -189,15 +285,16 @@ class WeatherChatbotV2:
             else:
                 return 'general_advice'
         except Exception as e:
-            logger.error(f"Error analyzing intent: {e}")
+            logger.error("Error analyzing intent: %s", e)
             return 'general_advice'
     
     def get_weather_analysis(self, user_type: str, location: Dict, 
                            target_date: Optional[date] = None) -> Dict:
         """Get weather analysis for specific user type and location"""
         try:
+            today = date.today()
             if not target_date:
-                target_date = date.today()
+                target_date = today
             
             lat = float(location.get('lat', 0))
             lon = float(location.get('lng', 0))
@@ -213,21 +310,23 @@ class WeatherChatbotV2:
                 }
             
             # Get weather data for the location
-            start_date = date(2020, 1, 1)  # Use more recent data
-            end_date = date.today()
+            start_date = _SERIES_START
+            end_date = today
             
             # Fetch relevant weather parameters
             if user_type == 'farmer':
-                parameters = ['T2M_MAX', 'T2M_MIN', 'PRECTOTCORR', 'WS10M']
+                parameters = _FARMER_PARAMETERS
             else:  # fisher
-                parameters = ['WS10M', 'PRECTOTCORR', 'T2M']
+                parameters = _FISHER_PARAMETERS
             
-            logger.info(f"Fetching weather data for lat={lat}, lon={lon}, params={parameters}")
+            logger.info("Fetching weather data for lat=%s, lon=%s, params=%s", lat, lon, parameters)
             
-            series = fetch_daily_series(
+            # Shared series cache: repeat questions for the same spot skip the POWER download.
+            # Both roles' parameters come down in one request, so switching role hits the cache.
+            series = fetch_series_arrays_cached(
                 lat=lat, lon=lon, 
                 start=start_date, end=end_date, 
-                parameters=parameters
+                parameters=_ALL_PARAMETERS
             )
             
             if not series:
@@ -239,12 +338,13 @@ class WeatherChatbotV2:
                     'user_type': user_type
                 }
             
-            # Analyze each parameter
+            # Analyze each parameter over the same +/-15 day window
+            lower, upper = doy_window_bounds(target_date, 15)
             analysis = {}
             for param in parameters:
                 try:
                     if param in series and series[param]:
-                        samples = select_dayofyear_window(series[param], target_date, 15)
+                        samples = select_doy_range(series[param], lower, upper)
                         if samples:
                             analysis[param] = self._analyze_parameter(
                                 param, samples, user_type, target_date
@@ -254,7 +354,7 @@ class WeatherChatbotV2:
                     else:
                         analysis[param] = {'error': f'Parameter {param} not available'}
                 except Exception as e:
-                    logger.error(f"Error analyzing parameter {param}: {e}")
+                    logger.error("Error analyzing parameter %s: %s", param, e)
                     analysis[param] = {'error': f'Failed to analyze {param}: {str(e)}'}
             
             return {
@@ -266,7 +366,7 @@ class WeatherChatbotV2:
             }
             
         except Exception as e:
-            logger.error(f"Error in weather analysis: {e}")
+            logger.error("Error in weather analysis: %s", e)
             return {
                 'success': False,
                 'error': f'Weather analysis failed: {str(e)}',
@@ -282,33 +382,19 @@ class WeatherChatbotV2:
             if not samples:
                 return {'error': 'No data available'}
             
-            # Filter out None values and invalid numbers
-            valid_samples = [
-                val for val in samples 
-                if val is not None 
-                and val == val  # Check for NaN
-                and val != float('inf') 
-                and val != float('-inf')
-                and val >= 0  # Ensure non-negative values for most weather parameters
-            ]
+            # Statistics over the valid samples (None, NaN and +/-inf are skipped)
+            count, mean_val, min_val, max_val = summarize_samples(samples)
+            valid_samples = samples
             
-            # For temperature parameters, allow negative values
-            if param in ['T2M_MAX', 'T2M_MIN', 'T2M']:
-                valid_samples = [
-                    val for val in samples 
-                    if val is not None 
-                    and val == val  # Check for NaN
-                    and val != float('inf') 
-                    and val != float('-inf')
-                ]
-            
-            if not valid_samples:
-                return {'error': 'No valid data'}
+            # Only temperature parameters may be negative
+            if min_val < 0 and param not in _SIGNED_PARAMETERS:
+                valid_samples = [val for val in samples if val is not None and 0 <= val < inf]
+                count, mean_val, min_val, max_val = summarize_samples(valid_samples)
+            elif count != len(samples):
+                valid_samples = [val for val in samples if val is not None and isfinite(val)]
             
-            # Calculate statistics
-            mean_val = sum(valid_samples) / len(valid_samples)
-            min_val = min(valid_samples)
-            max_val = max(valid_samples)
+            if not count:
+                return {'error': 'No valid data'}
             
             # Ensure reasonable values
             if param == 'WS10M':  # Wind speed should be positive
@@ -321,64 +407,53 @@ class WeatherChatbotV2:
                 max_val = max(0, max_val)
             
             # Get thresholds for this parameter and user type
-            thresholds = self.thresholds.get(user_type, {})
+            threshold_key = self._get_threshold_key(param)
             
             # Determine suitability
-            suitability = self._assess_suitability(param, mean_val, thresholds)
+            suitability = self._assess_suitability(user_type, threshold_key, mean_val)
             
-            return {
+            result = {
                 'mean': round(mean_val, 2),
                 'min': round(min_val, 2),
                 'max': round(max_val, 2),
                 'suitability': suitability,
-                'thresholds': thresholds.get(self._get_threshold_key(param), {}),
-                'sample_count': len(valid_samples)
+                'thresholds': self.thresholds.get(user_type, {}).get(threshold_key, {}),
+                'sample_count': count
             }
+            
+            # How the individual days in the window classify, next to the mean-based label
+            bounds = self._suitability_bounds.get(user_type, {}).get(threshold_key)
+            if bounds is not None:
+                result.update(_day_counts(valid_samples, bounds))
+            
+            return result
         except Exception as e:
-            logger.error(f"Error analyzing parameter {param}: {e}")
+            logger.error("Error analyzing parameter %s: %s", param, e)
             return {'error': f'Analysis failed: {str(e)}'}
     
     def _get_threshold_key(self, param: str) -> str:
         """Map parameter names to threshold keys"""
-        mapping = {
-            'T2M_MAX': 'temperature',
-            'T2M_MIN': 'temperature',
-            'T2M': 'temperature',
-            'PRECTOTCORR': 'precipitation',
-            'WS10M': 'wind',
-            'WS10M_MAX': 'wind'
-        }
-        return mapping.get(param, param.lower())
+        return _THRESHOLD_KEYS.get(param) or param.lower()
     
-    def _assess_suitability(self, param: str, value: float, thresholds: Dict) -> str:
-        """Assess weather suitability based on thresholds"""
+    def _assess_suitability(self, user_type: str, threshold_key: str, value: float) -> str:
+        """Assess weather suitability based on the precomputed threshold bounds"""
         try:
-            threshold_key = self._get_threshold_key(param)
-            param_thresholds = thresholds.get(threshold_key, {})
-            
-            if not param_thresholds:
+            bounds = self._suitability_bounds.get(user_type, {}).get(threshold_key)
+            if bounds is None:
                 return 'unknown'
             
+            lower, upper, optimal_min, optimal_max = bounds
+            
             # Check if value is within acceptable range
-            if 'min' in param_thresholds and value < param_thresholds['min']:
-                return 'poor'
-            if 'max' in param_thresholds and value > param_thresholds['max']:
+            if value < lower or value > upper:
                 return 'poor'
             
             # Check for optimal range (within 80% of threshold range)
-            if 'min' in param_thresholds and 'max' in param_thresholds:
-                range_size = param_thresholds['max'] - param_thresholds['min']
-                optimal_min = param_thresholds['min'] + 0.1 * range_size
-                optimal_max = param_thresholds['max'] - 0.1 * range_size
-                
-                if optimal_min <= value <= optimal_max:
-                    return 'excellent'
-                else:
-                    return 'good'
-            
+            if optimal_min <= value <= optimal_max:
+                return 'excellent'
             return 'good'
         except Exception as e:
-            logger.error(f"Error assessing suitability: {e}")
+            logger.error("Error assessing suitability: %s", e)
             return 'unknown'
     
     def generate_response(self, analysis_result: Dict, intent: str, 
@@ -404,58 +479,32 @@ class WeatherChatbotV2:
             else:
                 return self._generate_general_response(analysis, user_type, location, target_date)
         except Exception as e:
-            logger.error(f"Error generating response: {e}")
+            logger.error("Error generating response: %s", e)
             return self._generate_error_response(f"Response generation failed: {str(e)}")
     
     def _generate_suitability_response(self, analysis: Dict, user_type: str, 
                                      location: Dict, target_date: date) -> str:
         """Generate response for suitability check"""
         try:
-            location_name = location.get('name', f"{location.get('lat', 0):.2f}°, {location.get('lng', 0):.2f}°")
+            # Coordinates are only formatted when the location has no name
+            if 'name' in location:
+                location_name = location['name']
+            else:
+                location_name = f"{location.get('lat', 0):.2f}°, {location.get('lng', 0):.2f}°"
             
             if user_type == 'farmer':
                 return self._generate_farmer_suitability(analysis, location_name, target_date)
             else:
                 return self._generate_fisher_suitability(analysis, location_name, target_date)
         except Exception as e:
-            logger.error(f"Error generating suitability response: {e}")
+            logger.error("Error generating suitability response: %s", e)
             return self._generate_error_response(f"Suitability analysis failed: {str(e)}")
     
     def _generate_farmer_suitability(self, analysis: Dict, location_name: str, 
                                    target_date: date) -> str:
         """Generate farming suitability response"""
         try:
-            responses = []
-            
-            # Check precipitation
-            if 'PRECTOTCORR' in analysis and 'error' not in analysis['PRECTOTCORR']:
-                precip = analysis['PRECTOTCORR']
-                if precip['suitability'] == 'excellent':
-                    responses.append(f"🌧️ **Rain conditions**: Excellent! Expected {precip['mean']:.1f}mm of rain - perfect for irrigation and crop growth.")
-                elif precip['suitability'] == 'good':
-                    responses.append(f"🌧️ **Rain conditions**: Good with {precip['mean']:.1f}mm expected - suitable for farming activities.")
-                else:
-                    responses.append(f"🌧️ **Rain conditions**: Challenging with {precip['mean']:.1f}mm expected - consider irrigation needs.")
-            
-            # Check temperature
-            if 'T2M_MAX' in analysis and 'error' not in analysis['T2M_MAX']:
-                temp = analysis['T2M_MAX']
-                if temp['suitability'] == 'excellent':
-                    responses.append(f"🌡️ **Temperature**: Perfect farming weather! Max temperature around {temp['mean']:.1f}°C.")
-                elif temp['suitability'] == 'good':
-                    responses.append(f"🌡️ **Temperature**: Good conditions with max temperature around {temp['mean']:.1f}°C.")
-                else:
-                    responses.append(f"🌡️ **Temperature**: Challenging with max temperature around {temp['mean']:.1f}°C - consider heat protection.")
-            
-            # Check wind
-            if 'WS10M' in analysis and 'error' not in analysis['WS10M']:
-                wind = analysis['WS10M']
-                if wind['suitability'] == 'excellent':
-                    responses.append(f"💨 **Wind**: Calm conditions with {wind['mean']:.1f} km/h winds - ideal for spraying and fieldwork.")
-                elif wind['suitability'] == 'good':
-                    responses.append(f"💨 **Wind**: Moderate winds at {wind['mean']:.1f} km/h - suitable for most farming activities.")
-                else:
-                    responses.append(f"💨 **Wind**: Strong winds at {wind['mean']:.1f} km/h - avoid spraying and be cautious with equipment.")
+            responses = self._parameter_lines(analysis, _FARMER_LINES)
             
             # Overall recommendation
             overall_suitability = self._calculate_overall_suitability(analysis)
@@ -473,44 +522,15 @@ class WeatherChatbotV2:
             
             return f"🌾 **Farming Analysis for {location_name} on {target_date}**\n\n" + "\n\n".join(responses)
         except Exception as e:
-            logger.error(f"Error generating farmer suitability: {e}")
+            logger.error("Error generating farmer suitability: %s", e)
             return self._generate_error_response(f"Farming analysis failed: {str(e)}")
     
     def _generate_fisher_suitability(self, analysis: Dict, location_name: str, 
                                     target_date: date) -> str:
         """Generate fishing suitability response"""
         try:
-            responses = []
-            
-            # Check wind (most important for fishing)
-            if 'WS10M' in analysis and 'error' not in analysis['WS10M']:
-                wind = analysis['WS10M']
-                if wind['suitability'] == 'excellent':
-                    responses.append(f"💨 **Wind**: Perfect fishing conditions! Light winds at {wind['mean']:.1f} km/h - safe for boating.")
-                elif wind['suitability'] == 'good':
-                    responses.append(f"💨 **Wind**: Good conditions with {wind['mean']:.1f} km/h winds - suitable for fishing.")
-                else:
-                    responses.append(f"💨 **Wind**: Strong winds at {wind['mean']:.1f} km/h - consider staying ashore or fishing in protected areas.")
-            
-            # Check precipitation
-            if 'PRECTOTCORR' in analysis and 'error' not in analysis['PRECTOTCORR']:
-                precip = analysis['PRECTOTCORR']
-                if precip['suitability'] == 'excellent':
-                    responses.append(f"🌧️ **Rain**: Clear conditions with {precip['mean']:.1f}mm expected - excellent visibility.")
-                elif precip['suitability'] == 'good':
-                    responses.append(f"🌧️ **Rain**: Light rain possible ({precip['mean']:.1f}mm) - still good for fishing.")
-                else:
-                    responses.append(f"🌧️ **Rain**: Heavy rain expected ({precip['mean']:.1f}mm) - consider indoor activities or wait for better weather.")
-            
-            # Check temperature
-            if 'T2M' in analysis and 'error' not in analysis['T2M']:
-                temp = analysis['T2M']
-                if temp['suitability'] == 'excellent':
-                    responses.append(f"🌡️ **Temperature**: Comfortable fishing weather at {temp['mean']:.1f}°C.")
-                elif temp['suitability'] == 'good':
-                    responses.append(f"🌡️ **Temperature**: Good conditions at {temp['mean']:.1f}°C.")
-                else:
-                    responses.append(f"🌡️ **Temperature**: Extreme temperatures at {temp['mean']:.1f}°C - dress appropriately.")
+            # Wind first: it matters most for fishing
+            responses = self._parameter_lines(analysis, _FISHER_LINES)
             
             # Overall recommendation
             overall_suitability = self._calculate_overall_suitability(analysis)
@@ -528,9 +548,19 @@ class WeatherChatbotV2:
             
             return f"🎣 **Fishing Analysis for {location_name} on {target_date}**\n\n" + "\n\n".join(responses)
         except Exception as e:
-            logger.error(f"Error generating fisher suitability: {e}")
+            logger.error("Error generating fisher suitability: %s", e)
             return self._generate_error_response(f"Fishing analysis failed: {str(e)}")
     
+    def _parameter_lines(self, analysis: Dict, line_templates: Tuple) -> List[str]:
+        """One line per analyzed parameter, picked by its suitability ('poor' covers anything else)"""
+        responses = []
+        for param, templates in line_templates:
+            data = analysis.get(param)
+            if data is not None and 'error' not in data:
+                template = templates.get(data['suitability'], templates['poor'])
+                responses.append(template.format(mean=data['mean']))
+        return responses
+    
     def _generate_timing_response(self, analysis: Dict, user_type: str, 
                                 location: Dict, target_date: date) -> str:
         """Generate timing advice response"""
@@ -544,7 +574,7 @@ class WeatherChatbotV2:
             else:
                 return f"❌ **Timing Advice**: I'd recommend delaying your activities. Conditions on {target_date} are challenging - consider waiting for better weather."
         except Exception as e:
-            logger.error(f"Error generating timing response: {e}")
+            logger.error("Error generating timing response: %s", e)
             return self._generate_error_response(f"Timing analysis failed: {str(e)}")
     
     def _generate_optimal_timing_response(self, analysis: Dict, user_type: str, 
@@ -556,7 +586,7 @@ class WeatherChatbotV2:
             else:
                 return "🎣 **Optimal Timing**: For fishing, early morning and late afternoon are usually best. Look for calm winds (<10 km/h), clear skies, and stable weather patterns."
         except Exception as e:
-            logger.error(f"Error generating optimal timing response: {e}")
+            logger.error("Error generating optimal timing response: %s", e)
             return self._generate_error_response(f"Optimal timing analysis failed: {str(e)}")
     
     def _generate_risk_response(self, analysis: Dict, user_type: str, 
@@ -572,7 +602,7 @@ class WeatherChatbotV2:
             else:
                 return f"❌ **Risk Assessment**: High risk conditions for {target_date}. Consider postponing activities or take extra safety precautions."
         except Exception as e:
-            logger.error(f"Error generating risk response: {e}")
+            logger.error("Error generating risk response: %s", e)
             return self._generate_error_response(f"Risk assessment failed: {str(e)}")
     
     def _generate_general_response(self, analysis: Dict, user_type: str, 
@@ -581,7 +611,7 @@ class WeatherChatbotV2:
         try:
             return self._generate_suitability_response(analysis, user_type, location, target_date)
         except Exception as e:
-            logger.error(f"Error generating general response: {e}")
+            logger.error("Error generating general response: %s", e)
             return self._generate_error_response(f"General analysis failed: {str(e)}")
     
     def _generate_error_response(self, error: str) -> str:
@@ -594,15 +624,17 @@ class WeatherChatbotV2:
             if not analysis:
                 return 0.0
             
-            suitability_scores = []
-            for param, data in analysis.items():
+            # Scores are kept in tenths so the sum is exact integer arithmetic
+            total = 0
+            count = 0
+            for data in analysis.values():
                 if isinstance(data, dict) and 'suitability' in data and 'error' not in data:
-                    score_map = {'excellent': 1.0, 'good': 0.7, 'poor': 0.3, 'unknown': 0.5}
-                    suitability_scores.append(score_map.get(data['suitability'], 0.5))
+                    total += _SUITABILITY_SCORES.get(data['suitability'], 5)
+                    count += 1
             
-            return sum(suitability_scores) / len(suitability_scores) if suitability_scores else 0.5
+            return total / (count * 10) if count else 0.5
         except Exception as e:
-            logger.error(f"Error calculating overall suitability: {e}")
+            logger.error("Error calculating overall suitability: %s", e)
             return 0.5
     
     def _generate_location_prompt(self, user_type: str, extracted_location: Optional[Dict]) -> str:
@@ -624,5 +656,5 @@ class WeatherChatbotV2:
                 else:
                     return "📍 I'd be happy to help with weather advice! To provide accurate recommendations, I need to know your location. Could you please tell me:\n\n• The city or area you're interested in\n• Or provide the coordinates (latitude, longitude)\n\nFor example: 'I'm in Cairo, Egypt' or 'My location is 30.0444, 31.2357'"
         except Exception as e:
-            logger.error(f"Error generating location prompt: {e}")
+            logger.error("Error generating location prompt: %s", e)
             return "📍 I'd be happy to help with weather advice! To provide accurate recommendations, I need to know your location. Could you please provide the coordinates or tell me the specific area you're interested in?"
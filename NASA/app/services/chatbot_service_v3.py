@@ -1,25 +1,80 @@
 from __future__ import annotations
 
 from datetime import date, datetime
+from functools import lru_cache
 from typing import Dict, List, Optional, Tuple, Any
+import random
 import re
-import json
 import logging
 
 # Set up logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-try:
-    from app.services.power_client import fetch_daily_series
-    from app.utils.stats import select_dayofyear_window
-except ImportError as e:
-    logger.error(f"Import error: {e}")
-    # Fallback for testing
-    def fetch_daily_series(*args, **kwargs):
-        return {}
-    def select_dayofyear_window(*args, **kwargs):
-        return []
+
+# Common location patterns, tried in priority order (the first pattern that matches wins)
+_LOCATION_PATTERNS = tuple(re.compile(pattern) for pattern in (
+    r'in\s+([a-zA-Z\s]+)',
+    r'at\s+([a-zA-Z\s]+)',
+    r'near\s+([a-zA-Z\s]+)',
+    r'around\s+([a-zA-Z\s]+)',
+    r'([a-zA-Z\s]+)\s+area',
+    r'([a-zA-Z\s]+)\s+region',
+))
+_LOCATION_STOPWORDS = frozenset(['the', 'my', 'this', 'that', 'our', 'here'])
+
+# Two plain decimal numbers separated by a comma, e.g. "30.04, -31.2" (what float() accepts
+# from digits, dots and minus signs, with spaces around either number)
+_COORDINATE_QUERY = re.compile(r' *-?(?:\d+\.?\d*|\.\d+) *, *-?(?:\d+\.?\d*|\.\d+) *')
+
+# Activities that only make sense with a location (substring matches, as in _detect_user_type)
+_LOCATION_ACTIVITIES = ('farm', 'fish', 'cruise', 'sail', 'plant', 'harvest', 'boat')
+
+# Suitability -> score in tenths (averaged into the overall score)
+_SUITABILITY_SCORES = {'excellent': 10, 'good': 7, 'poor': 3, 'unknown': 5}
+
+# Mock regions as (lat_min, lat_max, lon_min, lon_max, region), checked in order;
+# coordinates outside all of them get the Cairo figures
+_MOCK_REGIONS = (
+    (27, 28, 33, 35, 'red_sea'),     # Red Sea area
+    (31, 32, 29, 30, 'alexandria'),  # Alexandria area
+)
+
+# Seasonal (temp, precip, wind) adjustments to the mock base values, January to December
+_SEASONAL_ADJUSTMENTS = (
+    (-3, 0.5, 2),   # January - cooler
+    (-2, 0.3, 1),   # February
+    (0, 0.2, 0),    # March
+    (2, 0.1, -1),   # April
+    (4, 0.0, -2),   # May
+    (6, 0.0, -1),   # June - hotter
+    (7, 0.0, 0),    # July - hottest
+    (6, 0.0, 1),    # August
+    (4, 0.1, 1),    # September
+    (2, 0.2, 2),    # October
+    (0, 0.3, 2),    # November
+    (-2, 0.4, 3),   # December - cooler
+)
+
+# Mock base values per region, picked in _get_mock_weather_analysis
+_MOCK_BASE_DATA = {
+    'red_sea': {
+        'T2M_MAX': 32.1, 'T2M_MIN': 22.8, 'T2M': 27.5,
+        'PRECTOTCORR': 0.5, 'WS10M': 12.3
+    },
+    'alexandria': {
+        'T2M_MAX': 26.8, 'T2M_MIN': 16.9, 'T2M': 21.9,
+        'PRECTOTCORR': 3.2, 'WS10M': 15.7
+    },
+    'cairo': {
+        'T2M_MAX': 28.5, 'T2M_MIN': 18.2, 'T2M': 23.4,
+        'PRECTOTCORR': 2.1, 'WS10M': 8.5
+    },
+}
+
+# Keywords scored by _detect_user_type (substring matches, so 'farm' also counts 'farmland')
+_FARMER_INDICATORS = ('farmer', 'farming', 'farm', 'crop', 'plant', 'harvest', 'agriculture')
+_FISHER_INDICATORS = ('fisher', 'fishing', 'fish', 'boat', 'sea', 'ocean', 'cruise', 'maritime')
 
 
 class WeatherChatbotV3:
@@ -64,6 +119,30 @@ class WeatherChatbotV3:
             'aswan': {'lat': 24.0889, 'lng': 32.8998, 'name': 'Aswan, Egypt'},
             'giza': {'lat': 30.0131, 'lng': 31.2089, 'name': 'Giza, Egypt'}
         }
+        
+        # Suggestion buttons send the same few prompts over and over
+        self._parse_query = lru_cache(maxsize=2048)(self._parse_query_text)
+        self._mock_analysis = lru_cache(maxsize=2048)(self._mock_analysis_for)
+    
+    def handle(self, query: str, location: Optional[Dict] = None,
+               target_date: Optional[date] = None) -> Dict:
+        """Answer one chat turn: ask for a location or return the weather advice"""
+        analysis = self.analyze_query(query, location)
+        user_type = analysis['user_type'] or 'farmer'  # Default to farmer
+        needs_location = analysis['needs_location'] or not location
+        
+        if needs_location:
+            response = self._generate_location_prompt(user_type, analysis['extracted_location'])
+        else:
+            weather_analysis = self.get_weather_analysis(user_type, location, target_date)
+            response = self.generate_response(weather_analysis, analysis['query_intent'], user_type, query)
+        
+        return {
+            'response': response,
+            'user_type': analysis['user_type'],
+            'needs_location': needs_location,
+            'extracted_location': analysis['extracted_location']
+        }
     
     def analyze_query(self, query: str, location: Optional[Dict] = None, 
                      conversation_context: Optional[Dict] = None) -> Dict:
@@ -83,11 +162,7 @@ class WeatherChatbotV3:
                     'is_coordinate': True
                 }
             
-            # Determine user type
-            user_type = self._detect_user_type(query_lower)
-            
-            # Extract location if mentioned
-            extracted_location = self._extract_location(query_lower)
+            user_type, extracted_location, query_intent = self._parse_query(query_lower)
             
             # Determine if location is needed
             needs_location = self._needs_location(query_lower, location, extracted_location)
@@ -96,7 +171,7 @@ class WeatherChatbotV3:
                 'user_type': user_type,
                 'extracted_location': extracted_location,
                 'needs_location': needs_location,
-                'query_intent': self._analyze_intent(query_lower, user_type),
+                'query_intent': query_intent,
                 'is_coordinate': False
             }
         except Exception as e:
@@ -109,44 +184,32 @@ class WeatherChatbotV3:
                 'is_coordinate': False
             }
     
+    def _parse_query_text(self, query_lower: str) -> Tuple[Optional[str], Optional[Dict], str]:
+        """User type, mentioned location and intent; depends on the query text only"""
+        user_type = self._detect_user_type(query_lower)
+        extracted_location = self._extract_location(query_lower)
+        return user_type, extracted_location, self._analyze_intent(query_lower, user_type)
+    
     def _is_coordinate_query(self, query: str) -> bool:
         """Check if query is just coordinates"""
         try:
-            # Remove spaces and check if it's just numbers, commas, dots, and dashes
-            cleaned = query.replace(' ', '').replace(',', '').replace('.', '').replace('-', '')
-            if cleaned.isdigit() and ',' in query:
-                # Check if it has exactly 2 parts separated by comma
-                parts = query.split(',')
-                if len(parts) == 2:
-                    try:
-                        float(parts[0].strip())
-                        float(parts[1].strip())
-                        return True
-                    except ValueError:
-                        pass
-            return False
+            return _COORDINATE_QUERY.fullmatch(query) is not None
         except Exception:
             return False
     
     def _detect_user_type(self, query: str) -> Optional[str]:
-        """Detect if user is farmer or fisherman based on keywords"""
+        """Detect if user is farmer or fisherman based on keywords (query is already lowercased)"""
         try:
-            query_lower = query.lower()
-            
-            # Check for explicit farmer mentions first
-            farmer_indicators = ['farmer', 'farming', 'farm', 'crop', 'plant', 'harvest', 'agriculture']
-            fisher_indicators = ['fisher', 'fishing', 'fish', 'boat', 'sea', 'ocean', 'cruise', 'maritime']
-            
-            farmer_score = sum(1 for keyword in farmer_indicators if keyword in query_lower)
-            fisher_score = sum(1 for keyword in fisher_indicators if keyword in query_lower)
-            
             # If user explicitly says "I'm a farmer", prioritize that
-            if 'i\'m a farmer' in query_lower or 'i am a farmer' in query_lower:
+            if 'i\'m a farmer' in query or 'i am a farmer' in query:
                 return 'farmer'
-            elif 'i\'m a fisher' in query_lower or 'i am a fisher' in query_lower:
+            elif 'i\'m a fisher' in query or 'i am a fisher' in query:
                 return 'fisher'
             
             # Otherwise use keyword scoring
+            farmer_score = len([keyword for keyword in _FARMER_INDICATORS if keyword in query])
+            fisher_score = len([keyword for keyword in _FISHER_INDICATORS if keyword in query])
+            
             if farmer_score > fisher_score and farmer_score > 0:
                 return 'farmer'
             elif fisher_score > farmer_score and fisher_score > 0:
@@ -164,22 +227,12 @@ class WeatherChatbotV3:
                 if location_name in query:
                     return location_data
             
-            # Common location patterns
-            location_patterns = [
-                r'in\s+([a-zA-Z\s]+)',
-                r'at\s+([a-zA-Z\s]+)',
-                r'near\s+([a-zA-Z\s]+)',
-                r'around\s+([a-zA-Z\s]+)',
-                r'([a-zA-Z\s]+)\s+area',
-                r'([a-zA-Z\s]+)\s+region'
-            ]
-            
-            for pattern in location_patterns:
-                match = re.search(pattern, query)
+            for pattern in _LOCATION_PATTERNS:
+                match = pattern.search(query)
                 if match:
                     location_name = match.group(1).strip()
-                    # Filter out common words
-                    if location_name.lower() not in ['the', 'my', 'this', 'that', 'our', 'here']:
+                    # Filter out common words (the query is already lowercased)
+                    if location_name not in _LOCATION_STOPWORDS:
                         return {'name': location_name}
             
             return None
@@ -200,11 +253,10 @@ class WeatherChatbotV3:
                 return False
             
             # Check if query mentions specific activities that require location
-            location_required_activities = [
-                'farm', 'fish', 'cruise', 'sail', 'plant', 'harvest', 'boat'
-            ]
-            
-            return any(activity in query for activity in location_required_activities)
+            for activity in _LOCATION_ACTIVITIES:
+                if activity in query:
+                    return True
+            return False
         except Exception as e:
             logger.error(f"Error checking location needs: {e}")
             return True
@@ -265,71 +317,17 @@ class WeatherChatbotV3:
             lat = float(location.get('lat', 0))
             lon = float(location.get('lng', 0))
             
-            # Generate date-based variations for more realistic data
-            day_of_year = target_date.timetuple().tm_yday
-            month = target_date.month
-            
             # Base weather data by location
-            if 27 <= lat <= 28 and 33 <= lon <= 35:  # Red Sea area
-                base_data = {
-                    'T2M_MAX': 32.1, 'T2M_MIN': 22.8, 'T2M': 27.5,
-                    'PRECTOTCORR': 0.5, 'WS10M': 12.3
-                }
-            elif 31 <= lat <= 32 and 29 <= lon <= 30:  # Alexandria area
-                base_data = {
-                    'T2M_MAX': 26.8, 'T2M_MIN': 16.9, 'T2M': 21.9,
-                    'PRECTOTCORR': 3.2, 'WS10M': 15.7
-                }
+            for lat_min, lat_max, lon_min, lon_max, name in _MOCK_REGIONS:
+                if lat_min <= lat <= lat_max and lon_min <= lon <= lon_max:
+                    region = name
+                    break
             else:  # Cairo area (default)
-                base_data = {
-                    'T2M_MAX': 28.5, 'T2M_MIN': 18.2, 'T2M': 23.4,
-                    'PRECTOTCORR': 2.1, 'WS10M': 8.5
-                }
-            
-            # Add seasonal variations based on month
-            seasonal_adjustments = {
-                1: {'temp': -3, 'precip': 0.5, 'wind': 2},   # January - cooler
-                2: {'temp': -2, 'precip': 0.3, 'wind': 1},   # February
-                3: {'temp': 0, 'precip': 0.2, 'wind': 0},    # March
-                4: {'temp': 2, 'precip': 0.1, 'wind': -1},   # April
-                5: {'temp': 4, 'precip': 0.0, 'wind': -2},   # May
-                6: {'temp': 6, 'precip': 0.0, 'wind': -1},   # June - hotter
-                7: {'temp': 7, 'precip': 0.0, 'wind': 0},    # July - hottest
-                8: {'temp': 6, 'precip': 0.0, 'wind': 1},    # August
-                9: {'temp': 4, 'precip': 0.1, 'wind': 1},    # September
-                10: {'temp': 2, 'precip': 0.2, 'wind': 2},   # October
-                11: {'temp': 0, 'precip': 0.3, 'wind': 2},   # November
-                12: {'temp': -2, 'precip': 0.4, 'wind': 3}   # December - cooler
-            }
+                region = 'cairo'
             
-            # Apply seasonal adjustments
-            adjustment = seasonal_adjustments.get(month, {'temp': 0, 'precip': 0, 'wind': 0})
-            
-            # Add some random variation based on day of year for more realistic data
-            import random
-            random.seed(day_of_year)  # Use day of year as seed for consistent "randomness"
-            
-            mock_data = {}
-            for param, base_value in base_data.items():
-                if param in ['T2M_MAX', 'T2M_MIN', 'T2M']:
-                    # Temperature adjustments
-                    variation = adjustment['temp'] + random.uniform(-2, 2)
-                    mock_data[param] = max(0, base_value + variation)
-                elif param == 'PRECTOTCORR':
-                    # Precipitation adjustments
-                    variation = adjustment['precip'] + random.uniform(-1, 1)
-                    mock_data[param] = max(0, base_value + variation)
-                elif param == 'WS10M':
-                    # Wind adjustments
-                    variation = adjustment['wind'] + random.uniform(-3, 3)
-                    mock_data[param] = max(0, base_value + variation)
-                else:
-                    mock_data[param] = base_value
-            
-            # Analyze parameters
-            analysis = {}
-            for param, value in mock_data.items():
-                analysis[param] = self._analyze_parameter(param, [value], user_type, target_date)
+            # The figures depend only on region and date, so repeated turns reuse them;
+            # the cache holds tuples and every caller gets its own dicts
+            analysis = {param: dict(fields) for param, fields in self._mock_analysis(region, user_type, target_date)}
             
             return {
                 'success': True,
@@ -349,6 +347,42 @@ class WeatherChatbotV3:
                 'user_type': user_type
             }
     
+    def _mock_analysis_for(self, region: str, user_type: str, target_date: date) -> Tuple[Tuple[str, Tuple], ...]:
+        """Mock parameter analysis for one region and date, as immutable (param, items) pairs"""
+        base_data = _MOCK_BASE_DATA[region]
+        
+        # Generate date-based variations for more realistic data
+        day_of_year = target_date.timetuple().tm_yday
+        month = target_date.month
+        
+        # Apply seasonal adjustments
+        temp_adjustment, precip_adjustment, wind_adjustment = _SEASONAL_ADJUSTMENTS[month - 1]
+        
+        # Add some random variation based on day of year for more realistic data
+        # (from a local generator, so concurrent requests don't reseed the global one)
+        rng = random.Random(day_of_year)  # Use day of year as seed for consistent "randomness"
+        
+        # Analyze each parameter as soon as its value is drawn
+        analysis = []
+        for param, base_value in base_data.items():
+            if param in ['T2M_MAX', 'T2M_MIN', 'T2M']:
+                # Temperature adjustments
+                variation = temp_adjustment + rng.uniform(-2, 2)
+                value = max(0, base_value + variation)
+            elif param == 'PRECTOTCORR':
+                # Precipitation adjustments
+                variation = precip_adjustment + rng.uniform(-1, 1)
+                value = max(0, base_value + variation)
+            elif param == 'WS10M':
+                # Wind adjustments
+                variation = wind_adjustment + rng.uniform(-3, 3)
+                value = max(0, base_value + variation)
+            else:
+                value = base_value
+            analysis.append((param, tuple(self._analyze_parameter(param, [value], user_type, target_date).items())))
+        
+        return tuple(analysis)
+    
     def _analyze_parameter(self, param: str, samples: List[float], 
                           user_type: str, target_date: date) -> Dict:
         """Analyze a specific weather parameter"""
@@ -390,10 +424,12 @@ class WeatherChatbotV3:
             else:
                 suitability = 'unknown'
             
+            # A single sample is its own mean, min and max
+            value = round(value, 2)
             return {
-                'mean': round(value, 2),
-                'min': round(value, 2),
-                'max': round(value, 2),
+                'mean': value,
+                'min': value,
+                'max': value,
                 'suitability': suitability,
                 'sample_count': 1
             }
@@ -448,31 +484,34 @@ class WeatherChatbotV3:
             responses = []
             
             # Check precipitation
-            if 'PRECTOTCORR' in analysis and 'error' not in analysis['PRECTOTCORR']:
-                precip = analysis['PRECTOTCORR']
-                if precip['suitability'] == 'excellent':
+            precip = analysis.get('PRECTOTCORR')
+            if precip is not None and 'error' not in precip:
+                suitability = precip['suitability']
+                if suitability == 'excellent':
                     responses.append(f"🌧️ **Rain conditions**: Excellent! Expected {precip['mean']:.1f}mm of rain - perfect for irrigation and crop growth.")
-                elif precip['suitability'] == 'good':
+                elif suitability == 'good':
                     responses.append(f"🌧️ **Rain conditions**: Good with {precip['mean']:.1f}mm expected - suitable for farming activities.")
                 else:
                     responses.append(f"🌧️ **Rain conditions**: Challenging with {precip['mean']:.1f}mm expected - consider irrigation needs.")
             
             # Check temperature
-            if 'T2M_MAX' in analysis and 'error' not in analysis['T2M_MAX']:
-                temp = analysis['T2M_MAX']
-                if temp['suitability'] == 'excellent':
+            temp = analysis.get('T2M_MAX')
+            if temp is not None and 'error' not in temp:
+                suitability = temp['suitability']
+                if suitability == 'excellent':
                     responses.append(f"🌡️ **Temperature**: Perfect farming weather! Max temperature around {temp['mean']:.1f}°C.")
-                elif temp['suitability'] == 'good':
+                elif suitability == 'good':
                     responses.append(f"🌡️ **Temperature**: Good conditions with max temperature around {temp['mean']:.1f}°C.")
                 else:
                     responses.append(f"🌡️ **Temperature**: Challenging with max temperature around {temp['mean']:.1f}°C - consider heat protection.")
             
             # Check wind
-            if 'WS10M' in analysis and 'error' not in analysis['WS10M']:
-                wind = analysis['WS10M']
-                if wind['suitability'] == 'excellent':
+            wind = analysis.get('WS10M')
+            if wind is not None and 'error' not in wind:
+                suitability = wind['suitability']
+                if suitability == 'excellent':
                     responses.append(f"💨 **Wind**: Calm conditions with {wind['mean']:.1f} km/h winds - ideal for spraying and fieldwork.")
-                elif wind['suitability'] == 'good':
+                elif suitability == 'good':
                     responses.append(f"💨 **Wind**: Moderate winds at {wind['mean']:.1f} km/h - suitable for most farming activities.")
                 else:
                     responses.append(f"💨 **Wind**: Strong winds at {wind['mean']:.1f} km/h - avoid spraying and be cautious with equipment.")
@@ -503,31 +542,34 @@ class WeatherChatbotV3:
             responses = []
             
             # Check wind (most important for fishing)
-            if 'WS10M' in analysis and 'error' not in analysis['WS10M']:
-                wind = analysis['WS10M']
-                if wind['suitability'] == 'excellent':
+            wind = analysis.get('WS10M')
+            if wind is not None and 'error' not in wind:
+                suitability = wind['suitability']
+                if suitability == 'excellent':
                     responses.append(f"💨 **Wind**: Perfect fishing conditions! Light winds at {wind['mean']:.1f} km/h - safe for boating.")
-                elif wind['suitability'] == 'good':
+                elif suitability == 'good':
                     responses.append(f"💨 **Wind**: Good conditions with {wind['mean']:.1f} km/h winds - suitable for fishing.")
                 else:
                     responses.append(f"💨 **Wind**: Strong winds at {wind['mean']:.1f} km/h - consider staying ashore or fishing in protected areas.")
             
             # Check precipitation
-            if 'PRECTOTCORR' in analysis and 'error' not in analysis['PRECTOTCORR']:
-                precip = analysis['PRECTOTCORR']
-                if precip['suitability'] == 'excellent':
+            precip = analysis.get('PRECTOTCORR')
+            if precip is not None and 'error' not in precip:
+                suitability = precip['suitability']
+                if suitability == 'excellent':
                     responses.append(f"🌧️ **Rain**: Clear conditions with {precip['mean']:.1f}mm expected - excellent visibility.")
-                elif precip['suitability'] == 'good':
+                elif suitability == 'good':
                     responses.append(f"🌧️ **Rain**: Light rain possible ({precip['mean']:.1f}mm) - still good for fishing.")
                 else:
                     responses.append(f"🌧️ **Rain**: Heavy rain expected ({precip['mean']:.1f}mm) - consider indoor activities or wait for better weather.")
             
             # Check temperature
-            if 'T2M' in analysis and 'error' not in analysis['T2M']:
-                temp = analysis['T2M']
-                if temp['suitability'] == 'excellent':
+            temp = analysis.get('T2M')
+            if temp is not None and 'error' not in temp:
+                suitability = temp['suitability']
+                if suitability == 'excellent':
                     responses.append(f"🌡️ **Temperature**: Comfortable fishing weather at {temp['mean']:.1f}°C.")
-                elif temp['suitability'] == 'good':
+                elif suitability == 'good':
                     responses.append(f"🌡️ **Temperature**: Good conditions at {temp['mean']:.1f}°C.")
                 else:
                     responses.append(f"🌡️ **Temperature**: Extreme temperatures at {temp['mean']:.1f}°C - dress appropriately.")
@@ -614,13 +656,15 @@ class WeatherChatbotV3:
             if not analysis:
                 return 0.0
             
-            suitability_scores = []
-            for param, data in analysis.items():
+            # Scores are kept in tenths so the sum is exact integer arithmetic
+            total = 0
+            count = 0
+            for data in analysis.values():
                 if isinstance(data, dict) and 'suitability' in data and 'error' not in data:
-                    score_map = {'excellent': 1.0, 'good': 0.7, 'poor': 0.3, 'unknown': 0.5}
-                    suitability_scores.append(score_map.get(data['suitability'], 0.5))
+                    total += _SUITABILITY_SCORES.get(data['suitability'], 5)
+                    count += 1
             
-            return sum(suitability_scores) / len(suitability_scores) if suitability_scores else 0.5
+            return total / (count * 10) if count else 0.5
         except Exception as e:
             logger.error(f"Error calculating overall suitability: {e}")
             return 0.5
@@ -0,0 +1,66 @@
+from __future__ import annotations
+
+from datetime import date
+from typing import Dict, Hashable, Iterable, List
+
+from app.services.power_client import fetch_daily_series
+from app.utils.series import SeriesArrays
+from app.utils.ttl_cache import TTLCache
+
+
+# Entries are per variable; a 40-year daily series is ~120 KB as columns, so keep the count modest.
+# POWER only appends one day per day; the end date is part of the key anyway.
+_SERIES_CACHE = TTLCache(maxsize=256, ttl=6 * 3600)
+
+
+def _cache_key(lat: float, lon: float, start: date, end: date, var: Hashable) -> tuple:
+    # ~100 m buckets; far finer than the POWER grid, so nearby pins share an entry.
+    return (round(lat, 3), round(lon, 3), start.toordinal(), end.toordinal(), var)
+
+
+def _collect_cached(
+    lat: float,
+    lon: float,
+    start: date,
+    end: date,
+    parameters: Iterable[str],
+    result: Dict[str, SeriesArrays],
+) -> List[str]:
+    """Copy cached variables into ``result``; return the ones still missing, in order."""
+    missing: List[str] = []
+    for var in parameters:
+        cached = _SERIES_CACHE.get(_cache_key(lat, lon, start, end, var))
+        if cached is None:
+            missing.append(var)
+        else:
+            result[var] = cached
+    return missing
+
+
+def fetch_series_arrays_cached(
+    lat: float,
+    lon: float,
+    start: date,
+    end: date,
+    parameters: List[str],
+) -> Dict[str, SeriesArrays]:
+    """Memoised ``fetch_daily_series``. Callers must treat the result as read-only.
+
+    Variables are cached individually; whatever is missing is fetched in one POWER request.
+    Concurrent callers missing the same set of variables share that request; callers missing
+    different (even overlapping) sets each fetch their own.
+    """
+    result: Dict[str, SeriesArrays] = {}
+    missing = _collect_cached(lat, lon, start, end, dict.fromkeys(parameters), result)
+    if not missing:
+        return result
+
+    # Coalesce on the whole missing set: the tuple of names never collides with a variable key
+    with _SERIES_CACHE.key_lock(_cache_key(lat, lon, start, end, tuple(missing))):
+        # Whoever held the lock before us may already have stored these variables
+        missing = _collect_cached(lat, lon, start, end, missing, result)
+        if missing:
+            for var, arrays in fetch_daily_series(lat=lat, lon=lon, start=start, end=end, parameters=missing).items():
+                _SERIES_CACHE.set(_cache_key(lat, lon, start, end, var), arrays)
+                result[var] = arrays
+    return result
@@ -1,13 +1,44 @@
 from __future__ import annotations
 
-from datetime import date, datetime
-from typing import Dict, List, Tuple
+from datetime import date
+from typing import Dict, Iterator, List, Tuple
 
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from app.utils.series import SeriesArrays
+
+try:
+    from orjson import loads as _json_loads
+except ImportError:  # orjson is optional; fall back to the stdlib parser
+    from json import loads as _json_loads
 
 
 BASE_URL = "https://power.larc.nasa.gov/api/temporal/daily/point"
 
+# One shared session so POWER calls reuse keep-alive connections instead of a new TCP+TLS
+# handshake each time. Gateway errors are retried briefly; the last response still goes
+# through raise_for_status. Read timeouts are never retried, so a stalled POWER endpoint
+# still gives up after one timeout instead of holding the worker for several.
+_SESSION = requests.Session()
+_SESSION.mount(
+    "https://",
+    HTTPAdapter(
+        pool_maxsize=16,
+        max_retries=Retry(
+            total=3,
+            connect=2,
+            read=0,
+            status=3,
+            backoff_factor=0.3,
+            status_forcelist=(502, 503, 504),
+            allowed_methods={"GET"},
+            raise_on_status=False,
+        ),
+    ),
+)
+
 
 def _build_params(parameters: List[str]) -> str:
     return ",".join(parameters)
@@ -19,7 +50,7 @@ def fetch_daily_series(
     start: date,
     end: date,
     parameters: List[str],
-) -> Dict[str, List[Tuple[datetime, float]]]:
+) -> Dict[str, SeriesArrays]:
     query = {
         "parameters": _build_params(parameters),
         "community": "RE",
@@ -29,25 +60,38 @@ def fetch_daily_series(
         "end": end.strftime("%Y%m%d"),
         "format": "JSON",
     }
-    resp = requests.get(BASE_URL, params=query, timeout=60)
+    resp = _SESSION.get(BASE_URL, params=query, timeout=60)
     resp.raise_for_status()
-    data = resp.json()
+    # Parsed straight from the body bytes: a multi-decade payload is ~1.5 MB of day keys
+    data = _json_loads(resp.content)
     # POWER JSON shape: properties.parameter.{VAR}.{YYYYMMDD: value}
     param_obj: Dict[str, Dict[str, float]] = data["properties"]["parameter"]
-    series: Dict[str, List[Tuple[datetime, float]]] = {}
+    series: Dict[str, SeriesArrays] = {}
     for var in parameters:
         series_map = param_obj.get(var)
         if series_map is None:
             raise ValueError(f"Variable {var} not available in POWER response")
-        items: List[Tuple[datetime, float]] = []
-        for ymd, val in series_map.items():
-            try:
-                dt = datetime.strptime(ymd, "%Y%m%d")
-                items.append((dt, float(val)))
-            except Exception:
-                continue
-        items.sort(key=lambda x: x[0])
-        series[var] = items
+        series[var] = SeriesArrays.from_items(_parse_items(series_map))
     return series
 
 
+def _parse_items(series_map: Dict[str, float]) -> Iterator[Tuple[date, float]]:
+    # POWER returns each variable's days in chronological order and the JSON object
+    # keeps that order, so the items are normally used as-is. YYYYMMDD keys compare
+    # lexically in date order; one pass over them confirms it before skipping the sort.
+    # Keys are split arithmetically: strptime re-reads its format string for every day.
+    items = series_map.items()
+    prev = ""
+    for ymd in series_map:
+        if ymd < prev:
+            items = sorted(items)
+            break
+        prev = ymd
+    for ymd, val in items:
+        try:
+            n = int(ymd)
+            yield date(n // 10000, n // 100 % 100, n % 100), float(val)
+        except Exception:
+            continue
+
+
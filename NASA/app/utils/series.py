@@ -0,0 +1,89 @@
+from __future__ import annotations
+
+from array import array
+from dataclasses import dataclass
+from datetime import date, timedelta
+from functools import cached_property
+from math import isfinite
+from typing import Dict, Iterable, Iterator, Tuple
+
+
+# POWER daily values carry ~4 significant digits, so single precision loses nothing
+# and halves the memory of every cached series.
+VALUE_TYPECODE = "f"
+# POWER marks missing days with this fill value instead of omitting them.
+POWER_FILL_VALUE = -999.0
+
+
+def as_stored(value: float) -> float:
+    """Round a float to the precision series values are stored at.
+
+    Use this on thresholds before comparing them against series values, so a
+    threshold equal to a stored reading still compares equal.
+    """
+    return array(VALUE_TYPECODE, [value])[0]
+
+
+@dataclass(frozen=True)
+class SeriesArrays:
+    """Column-oriented daily series: parallel year, day-of-year and value arrays.
+
+    Built once per fetched variable so request handlers never touch datetime
+    objects or re-derive the day of year per row.
+    """
+
+    years: array
+    doy: array
+    values: array
+
+    def __len__(self) -> int:
+        return len(self.values)
+
+    @cached_property
+    def by_doy(self) -> Tuple[array, array]:
+        """Finite values regrouped by day of year, with per-DOY offsets.
+
+        Values for day ``d`` are ``grouped[offsets[d]:offsets[d + 1]]`` in date order, so a
+        DOY window ``lower..upper`` is the single slice ``offsets[lower]:offsets[upper + 1]``.
+        Built once per (cached) series by a counting sort.
+        """
+        counts = [0] * 368
+        for doy, val in zip(self.doy, self.values):
+            if isfinite(val):
+                counts[doy] += 1
+        offsets = array("I", [0]) * 368
+        running = 0
+        for doy in range(367):
+            offsets[doy] = running
+            running += counts[doy]
+        offsets[367] = running
+        grouped = array(VALUE_TYPECODE, [0.0]) * running
+        cursor = list(offsets)
+        for doy, val in zip(self.doy, self.values):
+            if isfinite(val):
+                grouped[cursor[doy]] = val
+                cursor[doy] += 1
+        return grouped, offsets
+
+    def items(self) -> Iterator[Tuple[date, float]]:
+        """``(date, value)`` rows, for callers written against the old tuple-list form."""
+        for year, doy, val in zip(self.years, self.doy, self.values):
+            yield date(year, 1, 1) + timedelta(days=doy - 1), val
+
+    @classmethod
+    def from_items(cls, items: Iterable[Tuple[date, float]]) -> "SeriesArrays":
+        years = array("H")
+        doy = array("H")
+        values = array(VALUE_TYPECODE)
+        nan = float("nan")
+        # year -> ordinal of the day before 1 Jan; DOY is then one subtraction, no struct_time
+        year_base: Dict[int, int] = {}
+        for dt, val in items:
+            year = dt.year
+            base = year_base.get(year)
+            if base is None:
+                base = year_base[year] = date(year, 1, 1).toordinal() - 1
+            years.append(year)
+            doy.append(dt.toordinal() - base)
+            values.append(nan if val == POWER_FILL_VALUE else val)
+        return cls(years=years, doy=doy, values=values)
@@ -1,7 +1,11 @@
 from __future__ import annotations
 
+from array import array
 from datetime import date, datetime
-from typing import Iterable, Tuple, List, Tuple as Tup
+from math import isfinite, sqrt
+from typing import Iterable, Sequence, Tuple, List, Tuple as Tup
+
+from app.utils.series import SeriesArrays
 
 # import numpy as np  # Removed for Windows compatibility
 
@@ -11,34 +15,186 @@ def select_dayofyear_window(series: List[Tup[datetime, float]], center_date: dat
     lower = max(1, center - window_days)
     upper = min(366, center + window_days)
     vals: List[float] = []
+    year_base = {}  # year -> ordinal of the day before 1 Jan
     for dt, val in series:
-        doy = dt.timetuple().tm_yday
+        base = year_base.get(dt.year)
+        if base is None:
+            base = year_base[dt.year] = date(dt.year, 1, 1).toordinal() - 1
+        doy = dt.toordinal() - base
         if lower <= doy <= upper and val is not None:
             try:
                 v = float(val)
             except Exception:
                 continue
-            if v == v and v != float('inf') and v != float('-inf'):  # Check for NaN and inf
+            if isfinite(v):
                 vals.append(v)
     return vals
 
 
-def compute_exceedance_probability(samples: Iterable[float], threshold: float, comparison: str = "gt") -> float:
+def doy_window_bounds(center_date: date, window_days: int) -> Tup[int, int]:
+    """Day-of-year range ``lower..upper`` (clamped to 1..366) of a +/- ``window_days`` window."""
+    center = center_date.toordinal() - date(center_date.year, 1, 1).toordinal() + 1
+    return max(1, center - window_days), min(366, center + window_days)
+
+
+def select_doy_range(series: SeriesArrays, lower: int, upper: int) -> Sequence[float]:
+    """Finite values with day of year in ``lower..upper``, as one array slice.
+
+    Values come grouped by day of year rather than in date order. Callers slicing several
+    series for the same window compute the bounds once with ``doy_window_bounds``.
+    """
+    grouped, offsets = series.by_doy
+    return grouped[offsets[lower]:offsets[upper + 1]]
+
+
+def select_doy_window(series: SeriesArrays, center_date: date, window_days: int) -> Sequence[float]:
+    """Column-form ``select_dayofyear_window``: the finite window values as one array slice."""
+    return select_doy_range(series, *doy_window_bounds(center_date, window_days))
+
+
+def compute_doy_climatology(
+    series: SeriesArrays,
+) -> Tuple[List[int], List[float], List[float], List[float], List[float]]:
+    """Per day-of-year mean, median, p10 and p90 across all years."""
+    # The per-DOY grouping is shared with select_doy_window and built once per series.
+    grouped, offsets = series.by_doy
+    buckets = [grouped[offsets[doy]:offsets[doy + 1]].tolist() for doy in range(367)]
+    days: List[int] = []
+    means: List[float] = []
+    medians: List[float] = []
+    p10s: List[float] = []
+    p90s: List[float] = []
+    for doy, arr in enumerate(buckets):
+        n = len(arr)
+        if not n:
+            continue
+        days.append(doy)
+        means.append(sum(arr) / n)  # summed in date order, before the in-place sort
+        arr.sort()  # one in-place sort serves the median and both percentiles
+        medians.append(arr[n // 2] if n % 2 == 1 else (arr[n // 2 - 1] + arr[n // 2]) / 2)
+        p10s.append(arr[int(n * 0.1)])
+        p90s.append(arr[int(n * 0.9)])
+    return days, means, medians, p10s, p90s
+
+
+def summarize_samples(samples: Iterable[float]) -> Tuple[int, float, float, float]:
+    """(count, mean, min, max) of the finite samples; (0, nan, nan, nan) if there are none."""
+    if isinstance(samples, array):
+        values = samples.tolist()  # box each element once, not once per reduction
+    elif isinstance(samples, (list, tuple)):
+        values = samples
+    else:
+        values = list(samples)
+    # Fast path: a finite total means no NaN/inf (or None) is present, so the
+    # per-element filter can be skipped and sum/min/max each run as one C loop.
+    try:
+        total = sum(values)
+    except TypeError:
+        total = float("nan")
+    if values and isfinite(total):
+        n = len(values)
+        return n, total / n, min(values), max(values)
+
+    finite = [v for v in values if v is not None and isfinite(v)]
+    n = len(finite)
+    if not n:
+        nan = float("nan")
+        return 0, nan, nan, nan
+    return n, sum(finite) / n, min(finite), max(finite)
+
+
+def count_exceedances(samples: Iterable[float], threshold: float, comparison: str = "gt") -> Tuple[int, int]:
+    """``(k, n)``: how many of the ``n`` samples are above ("gt") or below ("lt") ``threshold``.
+
+    Pass ``k`` and ``n`` straight to ``wilson_confidence_interval``; rebuilding ``k`` from the
+    probability as ``int(p * n)`` can come out one short (e.g. 15/22 * 22 < 15).
+    """
     samples_list = list(samples)
-    n = len(samples_list)
-    if n == 0:
-        return float("nan")
     if comparison == "gt":
         k = sum(1 for x in samples_list if x > threshold)
     else:
         k = sum(1 for x in samples_list if x < threshold)
-    return k / n
+    return k, len(samples_list)
+
+
+def compute_exceedance_probability(samples: Iterable[float], threshold: float, comparison: str = "gt") -> float:
+    k, n = count_exceedances(samples, threshold, comparison)
+    return k / n if n else float("nan")
+
+
+def select_kth(values: Sequence[float], k: int) -> float:
+    """k-th smallest value (0-based) via quickselect: expected O(n), no full sort.
+
+    Does not modify the input; each round copies one partition (sometimes both) into new lists.
+    """
+    items = values
+    if not 0 <= k < len(items):
+        raise IndexError("k out of range")
+    while True:
+        pivot = items[len(items) // 2]
+        lows = [x for x in items if x < pivot]
+        if k < len(lows):
+            items = lows
+            continue
+        highs = [x for x in items if x > pivot]
+        n_le = len(items) - len(highs)
+        if k < n_le:
+            return pivot
+        k -= n_le
+        items = highs
+
+
+def sens_slope(xs: List[float], ys: List[float]) -> float:
+    """Sen's slope: (upper) median of all pairwise slopes, 0.0 if undefined."""
+    # n(n-1)/2 slopes packed as C doubles (8 bytes each) rather than a list of float objects;
+    # select_kth's first round still copies a partition of them (typically about half) back
+    # out as a list of Python floats
+    n = len(xs)
+    slopes = array("d", (
+        (ys[j] - ys[i]) / (xs[j] - xs[i])
+        for i in range(n)
+        for j in range(i + 1, n)
+        if xs[j] != xs[i]
+    ))
+    return float(select_kth(slopes, len(slopes) // 2)) if slopes else 0.0
+
+
+def mann_kendall_s(values: List[float]) -> int:
+    """Mann-Kendall S, i.e. sum of sign(x_j - x_i) over i < j, in O(n log n)."""
+    # Fenwick tree over value ranks: for each x_j count earlier values below/above it.
+    ranks = {v: i for i, v in enumerate(sorted(set(values)), start=1)}
+    tree = [0] * (len(ranks) + 1)
+
+    def prefix(i: int) -> int:
+        total = 0
+        while i > 0:
+            total += tree[i]
+            i -= i & -i
+        return total
+
+    s = 0
+    for seen, v in enumerate(values):
+        r = ranks[v]
+        less = prefix(r - 1)
+        greater = seen - prefix(r)
+        s += less - greater
+        i = r
+        while i < len(tree):
+            tree[i] += 1
+            i += i & -i
+    return s
+
+
+def mann_kendall_z(values: List[float]) -> float:
+    """Simplified Mann-Kendall Z score (no ties correction)."""
+    n = len(values)
+    var_s = n * (n - 1) * (2 * n + 5) / 18 if n >= 2 else 0
+    return mann_kendall_s(values) / (var_s ** 0.5) if var_s > 0 else 0.0
 
 
 def wilson_confidence_interval(k: int, n: int, confidence: float = 0.95) -> Tuple[float, float]:
     if n == 0:
         return (float("nan"), float("nan"))
-    from math import sqrt
 
     # 95% two-sided z
     if confidence == 0.95:
@@ -0,0 +1,77 @@
+from __future__ import annotations
+
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Hashable, Iterator, Tuple
+
+
+_MISSING = object()
+
+
+class TTLCache:
+    """Thread-safe LRU cache whose entries expire ``ttl`` seconds after insertion."""
+
+    def __init__(self, maxsize: int = 128, ttl: float = 3600.0) -> None:
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: "OrderedDict[Hashable, Tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._pending: Dict[Hashable, threading.Lock] = {}
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        with self._lock:
+            item = self._data.get(key, _MISSING)
+            if item is _MISSING:
+                return default
+            expires_at, value = item
+            if expires_at <= time.monotonic():
+                del self._data[key]
+                return default
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key: Hashable, value: Any) -> None:
+        with self._lock:
+            self._data[key] = (time.monotonic() + self.ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    @contextmanager
+    def key_lock(self, key: Hashable) -> Iterator[None]:
+        """Hold the per-key lock, so concurrent loads for ``key`` run one at a time.
+
+        ``key`` only names the load; it need not be an entry key. Re-check the cache once
+        inside, since whoever held the lock before may already have stored the result.
+        """
+        with self._lock:
+            lock = self._pending.setdefault(key, threading.Lock())
+        try:
+            with lock:
+                yield
+        finally:
+            with self._lock:
+                if self._pending.get(key) is lock:
+                    del self._pending[key]
+
+    def get_or_set(self, key: Hashable, compute: Callable[[], Any]) -> Any:
+        """Return the cached value, computing it at most once across concurrent callers."""
+        value = self.get(key, _MISSING)
+        if value is not _MISSING:
+            return value
+        with self.key_lock(key):
+            # Whoever held the lock before us may already have filled the entry.
+            value = self.get(key, _MISSING)
+            if value is _MISSING:
+                value = compute()
+                self.set(key, value)
+            return value
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
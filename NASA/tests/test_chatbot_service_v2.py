@@ -0,0 +1,45 @@
+import random
+from math import inf, isfinite, nextafter
+
+import pytest
+
+from app.services.chatbot_service_v2 import WeatherChatbotV2, _day_counts
+
+BOT = WeatherChatbotV2()
+BOUNDS = [
+    (role, key, bounds)
+    for role, role_bounds in BOT._suitability_bounds.items()
+    for key, bounds in role_bounds.items()
+]
+
+
+def _per_value_counts(user_type, threshold_key, values):
+    counts = {'days_excellent': 0, 'days_good': 0, 'days_poor': 0}
+    for value in values:
+        counts['days_' + BOT._assess_suitability(user_type, threshold_key, value)] += 1
+    return counts
+
+
+def _edge_values(bounds):
+    # Each finite bound exactly, plus the nearest floats either side of it
+    values = []
+    for edge in bounds:
+        if isfinite(edge):
+            values += [nextafter(edge, -inf), edge, nextafter(edge, inf)]
+    return values
+
+
+def test_bounds_include_a_one_sided_limit():
+    assert any(not isfinite(lower) or not isfinite(upper) for _, _, (lower, upper, _, _) in BOUNDS)
+
+
+@pytest.mark.parametrize("user_type, threshold_key, bounds", BOUNDS)
+def test_day_counts_match_per_value_classification(user_type, threshold_key, bounds):
+    rng = random.Random(5)
+    edges = _edge_values(bounds)
+    assert _day_counts(edges, bounds) == _per_value_counts(user_type, threshold_key, edges)
+    assert _day_counts([], bounds) == _per_value_counts(user_type, threshold_key, [])
+    for _ in range(200):
+        values = [rng.uniform(-20, 60) for _ in range(rng.randint(1, 40))]
+        values += rng.sample(edges, min(len(edges), rng.randint(0, 4)))
+        assert _day_counts(values, bounds) == _per_value_counts(user_type, threshold_key, values)
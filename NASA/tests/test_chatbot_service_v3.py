@@ -0,0 +1,19 @@
+from datetime import date
+
+from app.services.chatbot_service_v3 import WeatherChatbotV3
+
+
+def test_mock_analysis_results_do_not_share_state():
+    bot = WeatherChatbotV3()
+    day = date(2024, 7, 15)
+    first = bot.get_weather_analysis('farmer', {'lat': 30.04, 'lng': 31.24}, day)
+    expected = {param: dict(fields) for param, fields in first['analysis'].items()}
+
+    first['analysis']['T2M']['mean'] = 999
+    first['analysis'].pop('WS10M')
+
+    # Another location in the same (Cairo) region and date hits the memoized figures
+    second = bot.get_weather_analysis('farmer', {'lat': 30.1, 'lng': 31.3}, day)
+    assert second['success']
+    assert second['analysis'] == expected
+    assert second['analysis'] is not first['analysis']
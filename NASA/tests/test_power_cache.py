@@ -0,0 +1,71 @@
+import threading
+import time
+from datetime import date
+
+import pytest
+
+from app.services import power_cache
+
+START = date(1981, 1, 1)
+END = date(2024, 6, 30)
+N_THREADS = 16
+
+
+@pytest.fixture
+def fetches(monkeypatch):
+    """Replace the POWER request with a slow fake and record the variables of each call."""
+    calls = []
+
+    def fake_fetch(lat, lon, start, end, parameters):
+        calls.append(tuple(parameters))
+        time.sleep(0.05)  # keep the load in flight while other callers arrive
+        return {var: object() for var in parameters}
+
+    power_cache._SERIES_CACHE.clear()
+    monkeypatch.setattr(power_cache, "fetch_daily_series", fake_fetch)
+    yield calls
+    power_cache._SERIES_CACHE.clear()
+
+
+def test_concurrent_multi_variable_misses_share_one_fetch(fetches):
+    barrier = threading.Barrier(N_THREADS)
+    results = []
+
+    def worker():
+        barrier.wait()
+        results.append(power_cache.fetch_series_arrays_cached(30.04, 31.24, START, END, ["T2M", "WS10M", "T2M"]))
+
+    threads = [threading.Thread(target=worker) for _ in range(N_THREADS)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join(timeout=10)
+
+    assert fetches == [("T2M", "WS10M")]
+    assert len(results) == N_THREADS
+    assert all(r == results[0] and list(r) == ["T2M", "WS10M"] for r in results)
+    assert power_cache._SERIES_CACHE._pending == {}
+
+
+def test_only_missing_variables_are_fetched(fetches):
+    first = power_cache.fetch_series_arrays_cached(30.04, 31.24, START, END, ["T2M"])
+    second = power_cache.fetch_series_arrays_cached(30.04, 31.24, START, END, ["T2M", "PRECTOTCORR", "WS10M"])
+
+    assert fetches == [("T2M",), ("PRECTOTCORR", "WS10M")]
+    assert second["T2M"] is first["T2M"]
+    assert power_cache.fetch_series_arrays_cached(30.04, 31.24, START, END, ["WS10M", "T2M"]) == {
+        "WS10M": second["WS10M"],
+        "T2M": first["T2M"],
+    }
+    assert len(fetches) == 2
+
+
+def test_failed_fetch_is_not_cached(monkeypatch, fetches):
+    def failing_fetch(lat, lon, start, end, parameters):
+        raise RuntimeError("POWER unavailable")
+
+    monkeypatch.setattr(power_cache, "fetch_daily_series", failing_fetch)
+    with pytest.raises(RuntimeError):
+        power_cache.fetch_series_arrays_cached(30.04, 31.24, START, END, ["T2M", "WS10M"])
+    assert power_cache._SERIES_CACHE._pending == {}
+    assert len(power_cache._SERIES_CACHE) == 0
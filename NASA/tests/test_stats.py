@@ -0,0 +1,161 @@
+import random
+from datetime import date, timedelta
+
+import pytest
+
+from app.utils.series import POWER_FILL_VALUE, SeriesArrays, as_stored
+from app.utils.stats import (
+    count_exceedances,
+    mann_kendall_s,
+    mann_kendall_z,
+    select_dayofyear_window,
+    select_doy_window,
+    select_kth,
+    sens_slope,
+)
+
+
+def _sorted_sens_slope(xs, ys):
+    # Reference: the original full-sort Sen's slope from routes.trend (upper median)
+    slopes = []
+    for i in range(len(xs)):
+        for j in range(i + 1, len(xs)):
+            if xs[j] != xs[i]:
+                slopes.append((ys[j] - ys[i]) / (xs[j] - xs[i]))
+    return float(sorted(slopes)[len(slopes) // 2]) if slopes else 0.0
+
+
+def _pairwise_s(values):
+    # Reference: the original O(n^2) loop from routes.trend
+    s = 0
+    for i in range(len(values)):
+        for j in range(i + 1, len(values)):
+            s += 1 if values[j] > values[i] else (-1 if values[j] < values[i] else 0)
+    return s
+
+
+@pytest.mark.parametrize("values", [[], [0.5], [0.1, 0.2], [0.2, 0.1], [0.3, 0.3], [0.7] * 25])
+def test_mann_kendall_s_small_and_constant(values):
+    assert mann_kendall_s(values) == _pairwise_s(values)
+
+
+def test_mann_kendall_s_matches_pairwise_loop():
+    rng = random.Random(0)
+    for _ in range(300):
+        n = rng.randint(0, 60)
+        values = [rng.random() for _ in range(n)]
+        assert mann_kendall_s(values) == _pairwise_s(values)
+
+
+def test_mann_kendall_s_matches_pairwise_loop_with_ties():
+    rng = random.Random(1)
+    for _ in range(300):
+        n = rng.randint(0, 60)
+        # Few distinct values, so most pairs are ties
+        values = [rng.randint(0, 4) / 4 for _ in range(n)]
+        assert mann_kendall_s(values) == _pairwise_s(values)
+
+
+def test_mann_kendall_z_undefined_below_two_values():
+    assert mann_kendall_z([]) == 0.0
+    assert mann_kendall_z([0.4]) == 0.0
+    assert mann_kendall_z([0.4] * 10) == 0.0
+
+
+def test_select_kth_matches_sorted():
+    rng = random.Random(2)
+    for _ in range(300):
+        n = rng.randint(1, 80)
+        values = [rng.randint(0, 9) if rng.random() < 0.5 else rng.random() for _ in range(n)]
+        expected = sorted(values)
+        for k in (0, n // 2, n - 1, rng.randrange(n)):
+            assert select_kth(values, k) == expected[k]
+
+
+def test_select_kth_all_equal_and_leaves_input_alone():
+    values = [3.0] * 9
+    assert select_kth(values, 4) == 3.0
+    values = [5.0, 1.0, 4.0, 2.0, 3.0]
+    assert select_kth(values, 2) == 3.0
+    assert values == [5.0, 1.0, 4.0, 2.0, 3.0]
+
+
+@pytest.mark.parametrize("k", [-1, 3])
+def test_select_kth_out_of_range(k):
+    with pytest.raises(IndexError):
+        select_kth([1.0, 2.0, 3.0], k)
+    with pytest.raises(IndexError):
+        select_kth([], 0)
+
+
+@pytest.mark.parametrize("xs, ys", [
+    ([], []),
+    ([2000], [0.5]),
+    ([2000, 2001], [0.5, 0.7]),
+    ([2000, 2000], [0.5, 0.7]),
+    ([2000, 2001, 2002, 2003], [0.4] * 4),
+])
+def test_sens_slope_small_and_constant(xs, ys):
+    assert sens_slope(xs, ys) == _sorted_sens_slope(xs, ys)
+
+
+def test_sens_slope_matches_full_sort():
+    rng = random.Random(3)
+    for _ in range(300):
+        n = rng.randint(0, 40)
+        xs = list(range(1981, 1981 + n))
+        if rng.random() < 0.5:
+            ys = [rng.random() for _ in range(n)]
+        else:
+            # Coarse values give many identical slopes, including an even count of them
+            ys = [rng.randint(0, 3) / 4 for _ in range(n)]
+        assert sens_slope(xs, ys) == _sorted_sens_slope(xs, ys)
+
+
+def _random_daily_items(rng, n):
+    # Random days across several leap and non-leap years, with NaN and fill-value gaps
+    start = date(1981, 1, 1).toordinal()
+    days = sorted(date.fromordinal(start + rng.randrange(44 * 365)) for _ in range(n))
+    items = []
+    for day in days:
+        roll = rng.random()
+        if roll < 0.05:
+            val = float("nan")
+        elif roll < 0.10:
+            val = POWER_FILL_VALUE
+        else:
+            val = round(rng.uniform(-20, 45), 2)
+        items.append((day, val))
+    return items
+
+
+def test_select_doy_window_matches_row_scan():
+    rng = random.Random(4)
+    items = _random_daily_items(rng, 2000)
+    series = SeriesArrays.from_items(items)
+    # Reference: the per-row scan over what the series stores (fill days dropped, float32 values)
+    stored = [(day, as_stored(val)) for day, val in items if val != POWER_FILL_VALUE]
+    centers = [date(2000, 2, 29), date(2001, 1, 1), date(2001, 12, 31), date(2004, 12, 31)]
+    centers += [date(1981, 1, 1) + timedelta(days=rng.randrange(44 * 365)) for _ in range(100)]
+    for center in centers:
+        window = rng.randint(0, 60)
+        expected = select_dayofyear_window(stored, center, window)
+        # The DOY index groups values by day of year, not by date
+        assert sorted(select_doy_window(series, center, window)) == sorted(expected)
+
+
+def test_fill_values_are_dropped_from_windows():
+    day = date(2020, 6, 1)
+    series = SeriesArrays.from_items([(day, POWER_FILL_VALUE), (day + timedelta(days=1), 12.5)])
+    assert series.values[0] != series.values[0]  # stored as NaN
+    assert list(select_doy_window(series, day, 3)) == [12.5]
+
+
+def test_threshold_is_compared_at_stored_precision():
+    day = date(2020, 6, 1)
+    series = SeriesArrays.from_items([(day, 0.1)])
+    samples = select_doy_window(series, day, 0)
+    # 0.1 is stored as float32 0.100000001...; an unrounded threshold would count it as above
+    assert count_exceedances(samples, 0.1, "gt") == (1, 1)
+    assert count_exceedances(samples, as_stored(0.1), "gt") == (0, 1)
+    assert count_exceedances(samples, as_stored(0.1), "lt") == (0, 1)
@@ -0,0 +1,77 @@
+import threading
+import time
+
+import pytest
+
+from app.utils.ttl_cache import TTLCache
+
+
+N_THREADS = 16
+
+
+def _run_concurrently(target):
+    barrier = threading.Barrier(N_THREADS)
+
+    def worker():
+        barrier.wait()
+        target()
+
+    threads = [threading.Thread(target=worker) for _ in range(N_THREADS)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join(timeout=10)
+    assert not any(t.is_alive() for t in threads)
+
+
+def test_get_or_set_runs_loader_once_for_concurrent_misses():
+    cache = TTLCache(maxsize=8, ttl=60)
+    calls = []
+    results = []
+
+    def load():
+        calls.append(1)
+        time.sleep(0.05)  # keep the key busy while the other threads arrive
+        return "value"
+
+    _run_concurrently(lambda: results.append(cache.get_or_set("key", load)))
+
+    assert len(calls) == 1
+    assert results == ["value"] * N_THREADS
+    assert cache._pending == {}
+
+
+def test_get_or_set_releases_pending_lock_when_loader_raises():
+    cache = TTLCache(maxsize=8, ttl=60)
+    errors = []
+
+    def load():
+        time.sleep(0.01)
+        raise ValueError("upstream failed")
+
+    def call():
+        try:
+            cache.get_or_set("key", load)
+        except ValueError as e:
+            errors.append(e)
+
+    _run_concurrently(call)
+
+    assert len(errors) == N_THREADS
+    assert cache._pending == {}
+    assert cache.get("key") is None
+    # The key is usable again once the upstream recovers
+    assert cache.get_or_set("key", lambda: "value") == "value"
+    assert cache._pending == {}
+
+
+def test_get_or_set_single_caller_error_propagates():
+    cache = TTLCache(maxsize=8, ttl=60)
+
+    def load():
+        raise RuntimeError("boom")
+
+    with pytest.raises(RuntimeError):
+        cache.get_or_set("key", load)
+    assert cache._pending == {}
+    assert len(cache) == 0